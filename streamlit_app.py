@@ -1,108 +1,68 @@
 # 水差しパズル - 測定可能チェッカー (Cloudエラー対応緊急修正版)
-import streamlit as st
-import matplotlib.pyplot as plt
-import matplotlib.patches as mpatches
-import numpy as np
-import networkx as nx
-from collections import deque
-from math import gcd
-import os
-import sys
 import io
 
-# ====== 基本アルゴリズム関数 ======
+import streamlit as st
 
-def is_solvable(a, b, goal):
-    """数学的に解が存在するかチェック"""
-    if goal > max(a, b):
-        return False
-    return goal % gcd(a, b) == 0
+from water_jug_cache import RenderCache, SingleFlight, SolveCache
+from water_jug_disk_cache import DiskSolveCache
+from water_jug_moves import describe_move, search_moves, step_columns
+from water_jug_profile import current_profile, start_profile
+# ソルバーは water_jug_solver に分離（streamlit_app.solve_water_jug_problem なども従来どおり参照可）
+from water_jug_solver import (
+    CostModel,
+    ResumableSearch,
+    canonical_problem,
+    extract_path_states,
+    is_solvable,
+    iter_two_jug_solution,
+    plan_cost,
+    restore_moves,
+    solve_canonical,
+    solve_water_jug_exact,
+    solve_water_jug_problem,
+    solve_weighted,
+    two_jug_step_count,
+)
 
-def solve_water_jug_problem(a, b, goal):
-    """BFSで水差しパズルを解く"""
-    if not is_solvable(a, b, goal):
-        return None
-    
-    # BFSの初期設定
-    queue = deque([(0, 0, [])])
-    visited = set([(0, 0)])
-    
-    while queue:
-        state_a, state_b, path = queue.popleft()
-        
-        # ゴール状態のチェック
-        if state_a == goal or state_b == goal:
-            return path
-        
-        # 可能な操作の生成
-        operations = []
-        
-        # 操作1: Aを満たす
-        if state_a < a:
-            if (a, state_b) not in visited:
-                operations.append((a, state_b, f"A容器を満たす → ({a}L, {state_b}L)"))
-                visited.add((a, state_b))
-        
-        # 操作2: Bを満たす
-        if state_b < b:
-            if (state_a, b) not in visited:
-                operations.append((state_a, b, f"B容器を満たす → ({state_a}L, {b}L)"))
-                visited.add((state_a, b))
-        
-        # 操作3: Aを空にする
-        if state_a > 0:
-            if (0, state_b) not in visited:
-                operations.append((0, state_b, f"A容器を空にする → (0L, {state_b}L)"))
-                visited.add((0, state_b))
-        
-        # 操作4: Bを空にする
-        if state_b > 0:
-            if (state_a, 0) not in visited:
-                operations.append((state_a, 0, f"B容器を空にする → ({state_a}L, 0L)"))
-                visited.add((state_a, 0))
-        
-        # 操作5: AからBに移す
-        if state_a > 0 and state_b < b:
-            pour = min(state_a, b - state_b)
-            new_a, new_b = state_a - pour, state_b + pour
-            if (new_a, new_b) not in visited:
-                operations.append((new_a, new_b, f"AからBに{pour}L移す → ({new_a}L, {new_b}L)"))
-                visited.add((new_a, new_b))
-        
-        # 操作6: BからAに移す
-        if state_b > 0 and state_a < a:
-            pour = min(state_b, a - state_a)
-            new_a, new_b = state_a + pour, state_b - pour
-            if (new_a, new_b) not in visited:
-                operations.append((new_a, new_b, f"BからAに{pour}L移す → ({new_a}L, {new_b}L)"))
-                visited.add((new_a, new_b))
-        
-        # 次のステップをキューに追加
-        for next_a, next_b, operation in operations:
-            queue.append((next_a, next_b, path + [operation]))
-    
-    return None
+# ====== グラフ作成関数（英語ベース、エラー回避モード） ======
+# matplotlib / numpy はグラフを初めて描くときに関数内で読み込む（起動時間短縮のため）
 
-def extract_path_states(steps, a_cap, b_cap):
-    """ステップのリストから各状態を抽出"""
-    states = [(0, 0)]  # 初期状態
-    
-    for step in steps:
-        desc_parts = step.split("→")
-        if len(desc_parts) == 2:
-            state_str = desc_parts[1].strip()
-            if state_str.startswith("(") and state_str.endswith(")"):
-                # 括弧内の状態を抽出 (XL, YL)
-                state_str = state_str[1:-1].replace("L", "").strip()
-                a_val, b_val = map(int, state_str.split(","))
-                states.append((a_val, b_val))
-    
-    return states
+# 棒ごとの水量ラベルを描く最大の状態数（これを超えると省略し、手順ラベルも間引く）
+LABEL_STEP_LIMIT = 60
 
-# ====== グラフ作成関数（英語ベース、エラー回避モード） ======
+# 1Lごとに目盛りを打つ最大の容量合計（これを超えると自動の目盛りにする）
+TICK_PER_LITER_LIMIT = 40
+
+def _bar_collection(y_pos, widths, height=0.6, **kwargs):
+    """横棒（0からwidthsまで）をまとめた1つのPolyCollectionを作る"""
+    import numpy as np
+    from matplotlib.collections import PolyCollection
+    
+    top = y_pos + height / 2
+    bottom = y_pos - height / 2
+    zeros = np.zeros_like(widths)
+    # 各棒の4頂点 (左下, 右下, 右上, 左上) を (本数, 4, 2) の配列で組み立てる
+    verts = np.stack([
+        np.column_stack([zeros, bottom]),
+        np.column_stack([widths, bottom]),
+        np.column_stack([widths, top]),
+        np.column_stack([zeros, top]),
+    ], axis=1)
+    return PolyCollection(verts, linewidths=0, **kwargs)
 
 def create_simple_visualization(states, steps, a, b, goal):
-    """英語ベースの簡易グラフを作成（フォント問題回避）"""
+    """英語ベースの簡易グラフを作成（フォント問題回避）
+
+    A・Bそれぞれの棒は1つのPolyCollectionにまとめて描画するので、
+    手順が長くても1ステップあたりの描画コストはほぼ一定になる。
+    """
+    import numpy as np
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+    import matplotlib.patches as mpatches
+    from matplotlib.ticker import FuncFormatter
+    
     # 最低限の設定でフォント問題を回避
     plt.rcParams.update({
         'font.family': 'DejaVu Sans',
@@ -110,34 +70,35 @@ def create_simple_visualization(states, steps, a, b, goal):
         'figure.autolayout': True
     })
     
-    fig, ax = plt.subplots(figsize=(12, max(8, len(states) * 0.8)))
+    count = len(states)
+    volumes = np.asarray(states, dtype=float).reshape(count, 2)
+    y_pos = np.arange(count - 1, -1, -1)
+    show_labels = count <= LABEL_STEP_LIMIT
     
-    # 各ステップのバー描画
-    for i, (a_val, b_val) in enumerate(states):
-        y_pos = len(states) - i - 1
-        
-        # A容器（青色）
-        if a_val > 0:
-            ax.barh(y_pos, -a_val, height=0.6, color='#3498db', alpha=0.8)
-            ax.text(-a_val/2, y_pos, f"{a_val}L", 
-                    ha='center', va='center', color='white', fontweight='bold', fontsize=10)
-        
-        # B容器（緑色）
-        if b_val > 0:
-            ax.barh(y_pos, b_val, height=0.6, color='#2ecc71', alpha=0.8)
-            ax.text(b_val/2, y_pos, f"{b_val}L", 
-                    ha='center', va='center', color='white', fontweight='bold', fontsize=10)
-        
-        # ステップ説明（英語ベース）
-        step_description = ""
-        if i == 0:
-            step_description = "Initial state (0L, 0L)"
-        elif i <= len(steps):
-            action = steps[i-1].split("→")[0].strip()
-            step_description = f"Step {i}: {action}"
-                
-        ax.text(-a-0.5, y_pos, step_description, 
-                ha='right', va='center', fontsize=9)
+    fig, ax = plt.subplots(figsize=(12, max(8, min(count, LABEL_STEP_LIMIT) * 0.8)))
+    
+    # A容器（青色・左側）とB容器（緑色・右側）をそれぞれ1つのコレクションで描画
+    ax.add_collection(_bar_collection(y_pos, -volumes[:, 0], color='#3498db', alpha=0.8))
+    ax.add_collection(_bar_collection(y_pos, volumes[:, 1], color='#2ecc71', alpha=0.8))
+    
+    # 棒の中の水量ラベル（短い手順のときだけ）
+    if show_labels:
+        for (a_val, b_val), y in zip(states, y_pos):
+            if a_val > 0:
+                ax.text(-a_val/2, y, f"{a_val}L", 
+                        ha='center', va='center', color='white', fontweight='bold', fontsize=10)
+            if b_val > 0:
+                ax.text(b_val/2, y, f"{b_val}L", 
+                        ha='center', va='center', color='white', fontweight='bold', fontsize=10)
+    
+    # ステップ説明（英語ベース）はY軸の目盛りラベルとしてまとめて設定
+    stride = 1 if show_labels else -(-count // LABEL_STEP_LIMIT)
+    label_index = range(0, count, stride)
+    descriptions = ["Initial state (0L, 0L)" if i == 0 else f"Step {i}: {describe_move(steps[i-1])}"
+                    for i in label_index]
+    ax.set_yticks(y_pos[::stride])
+    ax.set_yticklabels(descriptions, fontsize=9)
+    ax.tick_params(axis='y', length=0)
     
     # グラフの設定
     ax.axvline(x=0, color='black', linestyle='-', linewidth=1)
@@ -145,16 +106,16 @@ def create_simple_visualization(states, steps, a, b, goal):
     ax.axvline(x=b, color='green', linestyle='--', linewidth=1, alpha=0.7)
     
     ax.set_xlim(-a-2, b+2)
-    ax.set_ylim(-0.5, len(states) - 0.5)
+    ax.set_ylim(-0.5, count - 0.5)
     
-    # X軸のラベル
-    x_ticks = list(range(-a, 0)) + list(range(0, b+1))
-    x_tick_labels = [f"{abs(x)}L" for x in x_ticks]
-    ax.set_xticks(x_ticks)
-    ax.set_xticklabels(x_tick_labels)
+    # X軸のラベル（大きな容量では自動の目盛りに水量表記だけ付ける）
+    if a + b <= TICK_PER_LITER_LIMIT:
+        x_ticks = list(range(-a, 0)) + list(range(0, b+1))
+        ax.set_xticks(x_ticks)
+        ax.set_xticklabels([f"{abs(x)}L" for x in x_ticks])
+    else:
+        ax.xaxis.set_major_formatter(FuncFormatter(lambda x, _: f"{abs(x):g}L"))
     
-    # Y軸を非表示
-    ax.set_yticks([])
     ax.grid(axis='x', linestyle='-', alpha=0.3)
     
     # タイトル英語表記
@@ -170,6 +131,211 @@ def create_simple_visualization(states, steps, a, b, goal):
     
     return fig
 
+def create_distance_heatmap(grid, states, a, b, goal):
+    """全状態 (x, y) の最短手数を1枚の画像で描き、解の経路を1本の線で重ねる
+
+    描画する要素は画像1枚と線1本なので、手順の長さに関係なく描画コストは一定。
+    """
+    import numpy as np
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+    from water_jug_grid import UNREACHABLE
+    
+    plt.rcParams.update({
+        'font.family': 'DejaVu Sans',
+        'font.size': 10,
+        'figure.autolayout': True
+    })
+    
+    fig, ax = plt.subplots(figsize=(10, 8))
+    cmap = plt.get_cmap('viridis').copy()
+    cmap.set_bad('#dddddd')
+    
+    # 行がAの水量、列がBの水量（到達できない状態は灰色）
+    image = ax.imshow(np.ma.masked_equal(grid, UNREACHABLE), cmap=cmap, origin='lower',
+                      aspect='auto', interpolation='nearest')
+    fig.colorbar(image, ax=ax, label="Steps from (0L, 0L)")
+    
+    # 解の経路（横軸B・縦軸A）
+    path = np.asarray(states).reshape(-1, 2)
+    marker = 'o' if len(path) <= LABEL_STEP_LIMIT else None
+    ax.plot(path[:, 1], path[:, 0], color='#e74c3c', linewidth=1.5, marker=marker, markersize=3,
+            label=f"Shortest path to {goal}L")
+    
+    ax.set_xlabel(f"Container B (0-{b}L)", fontsize=12)
+    ax.set_ylabel(f"Container A (0-{a}L)", fontsize=12)
+    ax.set_title(f"Shortest Step Count for Every State ({a}L, {b}L)", fontsize=14, fontweight='bold')
+    ax.legend(loc='upper right')
+    
+    return fig
+
+# ====== 解のキャッシュ ======
+
+@st.cache_resource
+def get_solve_cache():
+    """セッション・再実行をまたいで共有する (a, b, goal) → 手順 のキャッシュ"""
+    return SolveCache()
+
+@st.cache_resource
+def get_disk_cache():
+    """プロセスの再起動や同じホストの他のプロセスとも共有するSQLiteの解キャッシュ"""
+    return DiskSolveCache()
+
+@st.cache_resource
+def get_render_cache():
+    """セッション・再実行をまたいで共有する描画済みグラフ（PNG）のキャッシュ"""
+    return RenderCache()
+
+@st.cache_resource
+def get_single_flight():
+    """セッションをまたいで同時に来た同じ探索・描画を1回にまとめる"""
+    return SingleFlight()
+
+# グラフ画像の書き出し設定（st.pyplot の既定値と同じ）
+RENDER_OPTIONS = {"format": "png", "dpi": 200, "bbox_inches": "tight"}
+
+def render_visualization_png(steps, a, b, goal, language, plan=None):
+    """create_simple_visualization の結果をPNGで返す（同じ条件なら再描画しない）
+
+    plan は手順の求め方の識別子（最短手順ならNone、コスト最小ならコストモデル）。
+    """
+    cache = get_render_cache()
+    key = (a, b, goal, language, "simple", plan, tuple(sorted(RENDER_OPTIONS.items())))
+    png = cache.get(key)
+    if png is None:
+        png = get_single_flight().do(key, lambda: _render_png(steps, a, b, goal))
+        cache.put(key, png)
+    return png
+
+def render_heatmap_png(steps, a, b, goal, plan=None):
+    """create_distance_heatmap の結果をPNGで返す（同じ条件なら再描画しない）"""
+    cache = get_render_cache()
+    key = (a, b, goal, "heatmap", plan, tuple(sorted(RENDER_OPTIONS.items())))
+    png = cache.get(key)
+    if png is None:
+        png = get_single_flight().do(key, lambda: _render_heatmap_png(steps, a, b, goal))
+        cache.put(key, png)
+    return png
+
+def _render_png(steps, a, b, goal):
+    profile = current_profile()
+    with profile.timer("extract_path_states"):
+        states = extract_path_states(steps, a, b)
+    with profile.timer("figure_build"):
+        fig = create_simple_visualization(states, steps, a, b, goal)
+    return _figure_png(fig)
+
+def _render_heatmap_png(steps, a, b, goal):
+    from water_jug_grid import distance_grid
+    
+    profile = current_profile()
+    with profile.timer("extract_path_states"):
+        states = extract_path_states(steps, a, b)
+    with profile.timer("heatmap_grid"):
+        grid = distance_grid(a, b)
+    with profile.timer("figure_build"):
+        fig = create_distance_heatmap(grid, states, a, b, goal)
+    return _figure_png(fig)
+
+def _figure_png(fig):
+    """図をPNGに書き出して閉じる"""
+    import matplotlib.pyplot as plt
+    
+    buffer = io.BytesIO()
+    try:
+        with current_profile().timer("encode"):
+            fig.savefig(buffer, **RENDER_OPTIONS)
+    finally:
+        plt.close(fig)
+    return buffer.getvalue()
+
+def _solve_cached(a, b, goal):
+    """正規化済みの問題を メモリ → ディスク → 探索 の順に探す（同時に来た同じ問題は1回だけ解く）"""
+    key = (a, b, goal)
+    return get_solve_cache().get_or_compute(
+        key,
+        lambda: get_single_flight().do(
+            ("solve", *key),
+            lambda: get_disk_cache().get_or_compute(key, lambda: _solve_with_resumable_search(a, b, goal)),
+        ),
+    )
+
+def _solve_weighted_cached(a, b, goal, costs):
+    """コスト最小の手順（gcdで割った問題では、1Lあたりのコストをg倍して同じ最適解を求める）"""
+    key, g, swapped = canonical_problem(a, b, goal)
+    scaled = costs.scaled(g)
+    moves = get_solve_cache().get_or_compute(
+        ("weighted", *key, *scaled), lambda: solve_weighted(*key, scaled)
+    )
+    return restore_moves(moves, g, swapped)
+
+def _solve_with_resumable_search(a, b, goal):
+    """容量が同じなら中断したBFSを使い回し、目標量の変更では続きから探索する"""
+    search = st.session_state.get("resumable_search")
+    if search is None or (search.a, search.b) != (a, b):
+        search = ResumableSearch(a, b)
+        st.session_state["resumable_search"] = search
+    expanded = search.expanded
+    steps = search.solve(goal)
+    profile = current_profile()
+    profile.record("solved_by", "search" if search.expanded > expanded else "discovered")
+    profile.record("states_expanded", search.expanded - expanded)
+    profile.record("peak_queue", search.last_peak_frontier)
+    return steps
+
+# ====== 手順の表示 ======
+
+# 1ページに表示する手数の選択肢
+STEP_PAGE_SIZES = (25, 50, 100, 250)
+
+def _jump_to_step():
+    """「ステップへ移動」の変更時に、検索を解除してそのステップを含むページを開く"""
+    step = st.session_state["step_jump"]
+    if step:
+        st.session_state["step_search"] = ""
+        st.session_state["step_page"] = (step - 1) // st.session_state["step_page_size"] + 1
+
+def show_step_viewer(steps, use_japanese_ui):
+    """手順を表示中のページの分だけ表にして送る（ページ送り・ステップへの移動・検索つき）
+
+    1手ごとに要素を作らず、表示範囲の列データだけを st.dataframe に渡す。
+    """
+    if use_japanese_ui:
+        labels = ("検索 / Search", "1ページの手数 / Rows", "ステップへ移動 / Jump to step", "ページ / Page")
+    else:
+        labels = ("Search", "Rows per page", "Jump to step", "Page")
+    
+    # 前の問題の値が今の範囲を超えていればリセットする
+    if st.session_state.get("step_jump", 0) > len(steps):
+        st.session_state["step_jump"] = 0
+    
+    search_col, size_col, jump_col = st.columns(3)
+    query = search_col.text_input(labels[0], key="step_search", placeholder="pour, 4L, ...")
+    page_size = size_col.selectbox(labels[1], STEP_PAGE_SIZES, key="step_page_size")
+    jump_col.number_input(labels[2], min_value=0, max_value=len(steps), step=1,
+                          key="step_jump", on_change=_jump_to_step, help="0 = off")
+    
+    indices = search_moves(steps, query) if query.strip() else range(len(steps))
+    pages = max(1, -(-len(indices) // page_size))
+    page = 1
+    if pages > 1:
+        if st.session_state.get("step_page", 1) > pages:
+            st.session_state["step_page"] = pages
+        page = st.number_input(labels[3], min_value=1, max_value=pages, step=1, key="step_page")
+    
+    start = (page - 1) * page_size
+    window = indices[start:start + page_size]
+    if not window:
+        st.info("該当する手順はありません / No matching steps" if use_japanese_ui else "No matching steps")
+        return
+    st.dataframe(step_columns(steps, window), hide_index=True)
+    
+    caption = f"Step {window[0] + 1}–{window[-1] + 1} / {len(steps)}"
+    if query.strip():
+        caption += f" ({len(indices)} matches)"
+    st.caption(caption)
+
 # ====== メイン関数 ======
 
 def main():
@@ -218,6 +384,12 @@ def main():
         st.sidebar.header("表示オプション / Display Options")
         show_steps = st.sidebar.checkbox("ステップを表示 / Show Steps", value=True)
         show_graph = st.sidebar.checkbox("グラフで可視化 / Show Graph", value=True)
+        show_heatmap = st.sidebar.checkbox("全状態の手数マップ / Show Distance Heatmap", value=False)
+        
+        st.sidebar.header("コスト / Cost Model")
+        optimize_cost = st.sidebar.checkbox("コスト最小の手順を探す / Minimize Cost", value=False)
+        cost_labels = ("汲んだ水1Lあたり / Per liter filled", "捨てた水1Lあたり / Per liter emptied",
+                       "移し替え1回あたり / Per pour", "操作1回あたり / Per operation")
     else:
         st.sidebar.header("Parameters")
         a = st.sidebar.number_input("Container A Capacity (L)", min_value=1, max_value=20, value=3)
@@ -227,6 +399,25 @@ def main():
         st.sidebar.header("Display Options")
         show_steps = st.sidebar.checkbox("Show Steps", value=True)
         show_graph = st.sidebar.checkbox("Show Graph", value=True)
+        show_heatmap = st.sidebar.checkbox("Show Distance Heatmap", value=False)
+        
+        st.sidebar.header("Cost Model")
+        optimize_cost = st.sidebar.checkbox("Minimize Cost", value=False)
+        cost_labels = ("Per liter filled", "Per liter emptied", "Per pour", "Per operation")
+    
+    costs = None
+    if optimize_cost:
+        costs = CostModel(*(
+            st.sidebar.number_input(label, min_value=0.0, value=float(default), step=0.5)
+            for label, default in zip(cost_labels, CostModel())
+        ))
+    
+    show_profile = st.sidebar.checkbox(
+        "処理時間を表示 / Debug: Profile" if use_japanese_ui else "Debug: Profile", value=False
+    )
+    
+    # 計測しないときは何も記録しない NullProfile になる
+    profile = start_profile(show_profile)
 
     # メイン処理
     if use_japanese_ui:
@@ -244,11 +435,26 @@ def main():
             spinner_text = "Calculating shortest path..."
         
         # 解を求める
-        with st.spinner(spinner_text):
-            steps = solve_water_jug_problem(a, b, goal)
+        with st.spinner(spinner_text), profile.timer("solve"):
+            # キャッシュから返ったときは探索の統計は0のまま
+            profile.record("solved_by", "cache")
+            profile.record("states_expanded", 0)
+            profile.record("peak_queue", 0)
+            if costs is None:
+                # gcdで割り、A/Bをそろえた代表の問題で解いてキャッシュを共有する
+                steps = solve_canonical(a, b, goal, _solve_cached)
+            else:
+                profile.record("solved_by", "weighted")
+                steps = _solve_weighted_cached(a, b, goal, costs)
         
         if steps:
-            if use_japanese_ui:
+            if costs is not None:
+                total = plan_cost(steps, costs)
+                if use_japanese_ui:
+                    st.write(f"コスト最小の手順 / Minimum-cost plan: {len(steps)}ステップ, コスト {total:g}")
+                else:
+                    st.write(f"Minimum-cost plan: {len(steps)} steps, total cost {total:g}")
+            elif use_japanese_ui:
                 st.write(f"最短手順 / Shortest path: {len(steps)}ステップ")
             else:
                 st.write(f"Shortest path: {len(steps)} steps")
@@ -260,8 +466,7 @@ def main():
                 else:
                     st.write("📝 Detailed Steps")
                 
-                for i, step in enumerate(steps, 1):
-                    st.write(f"Step {i}: {step}")
+                show_step_viewer(steps, use_japanese_ui)
             
             # グラフ可視化
             if show_graph:
@@ -270,14 +475,25 @@ def main():
                 else:
                     st.write("📈 Visual Steps")
                 
-                states = extract_path_states(steps, a, b)
                 try:
-                    # 安全なエラー回避版グラフ生成
-                    fig = create_simple_visualization(states, steps, a, b, goal)
-                    st.pyplot(fig)
+                    # 安全なエラー回避版グラフ生成（描画済みPNGはキャッシュから返す）
+                    png = render_visualization_png(steps, a, b, goal, language_setting, costs)
+                    st.image(png)
                 except Exception as e:
                     st.error(f"Error generating visualization: {e}")
                     st.info("Try refreshing the page or using smaller container sizes.")
+            
+            # 全状態の最短手数マップ
+            if show_heatmap:
+                if use_japanese_ui:
+                    st.write("🗺️ 全状態の最短手数 / Distance Heatmap")
+                else:
+                    st.write("🗺️ Distance Heatmap")
+                
+                try:
+                    st.image(render_heatmap_png(steps, a, b, goal, costs))
+                except Exception as e:
+                    st.error(f"Error generating heatmap: {e}")
         else:
             if use_japanese_ui:
                 st.error("❌ エラー: パスが見つかりませんでした。")
@@ -323,5 +539,21 @@ def main():
     st.markdown("💡 **Technical Note:** This app uses BFS (Breadth-First Search) algorithm to find the shortest solution path.")
     st.markdown("📌 **Font Notice:** Due to font limitations in Streamlit Cloud, visualization is shown in English.")
 
+    # キャッシュの効き具合と、同時に来た同じ計算をまとめた回数（運用時の確認用）
+    with st.sidebar.expander("Server stats"):
+        st.json({
+            "solve_cache": get_solve_cache().stats(),
+            "render_cache": get_render_cache().stats(),
+            "single_flight": get_single_flight().stats(),
+        })
+    
+    # リクエストごとの計測結果（コードからは st.session_state["last_profile"] でも参照できる）
+    report = profile.as_dict()
+    if profile.enabled:
+        st.session_state["last_profile"] = report
+        with st.sidebar.expander("⏱ Profile", expanded=True):
+            st.json(report)
+    return report
+
 if __name__ == "__main__":
     main()
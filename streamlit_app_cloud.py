@@ -1,179 +1,53 @@
 # 水差しパズル - 測定可能チェッカー（Streamlit Cloud対応版）
 import streamlit as st
-import matplotlib.pyplot as plt
-import matplotlib.patches as mpatches
-import numpy as np
-import networkx as nx
-import matplotlib.font_manager as fm
 from collections import deque
 from math import gcd
+from water_jug_cache import RenderCache, SolveCache
+from water_jug_fonts import apply_font_settings, load_font_settings
+from water_jug_moves import EMPTY, FILL, format_state, jug_name, move_between, path_states
+from water_jug_solver import solve_canonical
+from water_jug_state import StateTable
+import io
 import os
-import platform
 
-# Streamlit Cloud環境用の日本語フォント設定
-def setup_matplotlib_japanese_cloud():
-    """Streamlit Cloud環境での確実な日本語フォント設定"""
-    japanese_support = False
-    
-    # 環境検出
-    is_cloud = (
-        os.environ.get('STREAMLIT_SERVER_PORT') or 
-        'streamlit' in platform.platform().lower() or
-        os.environ.get('DYNO')  # Heroku
-    )
-    
-    # Matplotlibバックエンドを明示的に設定
-    import matplotlib
-    matplotlib.use('Agg')
-    
-    try:
-        # ステップ1: japanize-matplotlibを試行
-        import japanize_matplotlib
-        japanize_matplotlib.japanize()
-        
-        if is_cloud:
-            # Streamlit Cloud環境用フォント設定
-            font_candidates = [
-                'Noto Sans CJK JP',    # Linux環境での日本語フォント
-                'DejaVu Sans',         # フォールバック
-                'sans-serif'
-            ]
-            plt.rcParams['font.family'] = font_candidates
-            st.info("🌐 Streamlit Cloud環境で japanize-matplotlib を使用中")
-        else:
-            # ローカル環境用フォント設定
-            font_candidates = [
-                'Noto Sans JP',
-                'BIZ UDGothic', 
-                'Yu Gothic',
-                'sans-serif'
-            ]
-            plt.rcParams['font.family'] = font_candidates
-            st.info("💻 ローカル環境で japanize-matplotlib を使用中")
-        
-        # 基本設定
-        plt.rcParams['axes.unicode_minus'] = False
-        plt.rcParams['font.size'] = 10
-        
-        # フォントキャッシュ更新
-        try:
-            fm.fontManager.__init__()
-        except:
-            pass
-        
-        # 日本語テスト
-        try:
-            fig, ax = plt.subplots(figsize=(2, 1))
-            ax.text(0.5, 0.5, '日本語テスト', ha='center', va='center', fontsize=10)
-            plt.close(fig)
-            japanese_support = True
-            st.success("✅ 日本語フォント設定完了")
-        except Exception as e:
-            st.warning(f"⚠️ 日本語テストエラー: {e}")
-            
-    except ImportError:
-        # japanize-matplotlibがない場合の手動設定
-        st.warning("⚠️ japanize-matplotlib 未インストール - 手動設定を試行中")
-        
-        if is_cloud:
-            # Cloud環境: 最小限の英語フォント
-            plt.rcParams['font.family'] = ['DejaVu Sans', 'sans-serif']
-            st.info("🌐 Cloud環境: 英語フォントを使用")
-        else:
-            # ローカル環境: 利用可能なフォントを検索
-            available_fonts = [f.name for f in fm.fontManager.ttflist]
-            
-            japanese_fonts = [
-                'Noto Sans JP', 'BIZ UDGothic', 'Yu Gothic', 
-                'Meiryo', 'MS Gothic', 'Hiragino Sans'
-            ]
-            
-            found_font = None
-            for font in japanese_fonts:
-                if font in available_fonts:
-                    found_font = font
-                    break
-            
-            if found_font:
-                plt.rcParams['font.family'] = [found_font, 'sans-serif']
-                japanese_support = True
-                st.success(f"✅ 日本語フォント見つかりました: {found_font}")
-            else:
-                plt.rcParams['font.family'] = ['DejaVu Sans', 'sans-serif']
-                st.info("💻 ローカル環境: 英語フォントを使用")
-        
-        plt.rcParams['axes.unicode_minus'] = False
-    
-    except Exception as e:
-        # エラー時の安全なフォールバック
-        plt.rcParams['font.family'] = ['DejaVu Sans', 'sans-serif']
-        plt.rcParams['axes.unicode_minus'] = False
-        st.error(f"❌ フォント設定エラー: {e}")
-    
-    return japanese_support
-
-# フォント設定を実行
-japanese_support = setup_matplotlib_japanese_cloud()
+# 日本語フォント設定（検出結果はマニフェストから読むだけ。matplotlibへの反映は描画時）
+font_settings = load_font_settings()
+japanese_support = font_settings["japanese_support"]
 
 def is_solvable(a, b, goal):
     """数学的に解が存在するかチェック"""
     return goal <= max(a, b) and goal % gcd(a, b) == 0
 
 def simulate_pour_path(path, a_cap, b_cap):
-    """パスから操作ログを生成"""
-    log = []
-    for i in range(1, len(path)):
-        a1, b1 = path[i - 1]
-        a2, b2 = path[i]
-        
-        if a2 == a_cap and a1 != a_cap:
-            if japanese_support:
-                log.append(f"Aを満タンにする → ({a2}L, {b2}L)")
-            else:
-                log.append(f"Fill A completely → ({a2}L, {b2}L)")
-        elif b2 == b_cap and b1 != b_cap:
-            if japanese_support:
-                log.append(f"Bを満タンにする → ({a2}L, {b2}L)")
-            else:
-                log.append(f"Fill B completely → ({a2}L, {b2}L)")
-        elif a2 == 0 and a1 != 0:
-            if japanese_support:
-                log.append(f"Aを空にする → ({a2}L, {b2}L)")
-            else:
-                log.append(f"Empty A → ({a2}L, {b2}L)")
-        elif b2 == 0 and b1 != 0:
-            if japanese_support:
-                log.append(f"Bを空にする → ({a2}L, {b2}L)")
-            else:
-                log.append(f"Empty B → ({a2}L, {b2}L)")
-        elif a2 < a1 and b2 > b1:
-            transfer = b2 - b1
-            if japanese_support:
-                log.append(f"A→Bに{transfer}L注ぐ → ({a2}L, {b2}L)")
-            else:
-                log.append(f"Pour {transfer}L from A→B → ({a2}L, {b2}L)")
-        elif b2 < b1 and a2 > a1:
-            transfer = a2 - a1
-            if japanese_support:
-                log.append(f"B→Aに{transfer}L注ぐ → ({a2}L, {b2}L)")
-            else:
-                log.append(f"Pour {transfer}L from B→A → ({a2}L, {b2}L)")
-        else:
-            if japanese_support:
-                log.append(f"状態変化 → ({a2}L, {b2}L)")
-            else:
-                log.append(f"State change → ({a2}L, {b2}L)")
-    
-    return log
+    """パス（状態のリスト）から操作ログ（Moveのリスト）を生成"""
+    return [move_between(path[i - 1], path[i], (a_cap, b_cap)) for i in range(1, len(path))]
+
+def describe_step(move):
+    """操作部分の表示用文字列（フォント対応に応じて日本語/英語）"""
+    name = jug_name(move.source)
+    if move.op == FILL:
+        return f"{name}を満タンにする" if japanese_support else f"Fill {name} completely"
+    if move.op == EMPTY:
+        return f"{name}を空にする" if japanese_support else f"Empty {name}"
+    target = jug_name(move.target)
+    if japanese_support:
+        return f"{name}→{target}に{move.amount}L注ぐ"
+    return f"Pour {move.amount}L from {name}→{target}"
+
+def format_step(move):
+    """1手の表示用文字列"""
+    return f"{describe_step(move)} → {format_state(move.state)}"
 
 def solve_water_jug_problem(a_cap, b_cap, goal):
-    """水差しパズルを解く"""
-    G = nx.DiGraph()
-    visited = set()
-    queue = deque()
-    initial = (0, 0)
-    queue.append(initial)
-    visited.add(initial)
+    """水差しパズルを解く
+
+    (0, 0) からBFSで探索し、目標量を含む状態に最初に到達した時点で打ち切る。
+    直前の状態へのリンクは StateTable（配列）に記録し、グラフは作らない。
+    """
+    visited = StateTable(a_cap, b_cap)
+    width = visited.width
+    queue = deque([0])
+    visited.visit(0)
 
     def next_states(a, b):
         """現在の状態から遷移可能な次の状態を生成"""
@@ -193,54 +67,30 @@ def solve_water_jug_problem(a_cap, b_cap, goal):
         
         return states
 
-    # BFSで状態空間を探索
+    # BFSで状態空間を探索（目標量を含む状態で終了）
     while queue:
-        current = queue.popleft()
-        for next_state in next_states(*current):
-            if next_state not in visited:
-                visited.add(next_state)
-                queue.append(next_state)
-            G.add_edge(current, next_state)
-    
-    # 目標量を含む状態を探す
-    goal_states = [s for s in visited if goal in s]
-    
-    for goal_state in goal_states:
-        try:
-            path = nx.shortest_path(G, source=initial, target=goal_state)
+        code = queue.popleft()
+        current = divmod(code, width)
+        if goal in current:
+            path = [(0, 0)] + [visited.decode(step_code) for _, step_code, _ in visited.chain(code)]
             return simulate_pour_path(path, a_cap, b_cap)
-        except nx.NetworkXNoPath:
-            continue
+        for op, (next_a, next_b) in enumerate(next_states(*current)):
+            next_code = next_a * width + next_b
+            if visited.visit(next_code, code, op):
+                queue.append(next_code)
     
     return []
 
 def extract_path_states(steps, a_cap, b_cap):
-    """ステップから各状態を抽出"""
-    states = [(0, 0)]  # 初期状態
-    
-    for step in steps:
-        try:
-            # "→ (xL, yL)" の形式から数値を抽出
-            if "→" in step and "(" in step and ")" in step:
-                state_part = step.split("→")[1].strip()
-                state_str = state_part.split("(")[1].split(")")[0]
-                parts = state_str.split(",")
-                
-                a_val = int(parts[0].strip().replace("L", ""))
-                b_val = int(parts[1].strip().replace("L", ""))
-                states.append((a_val, b_val))
-            else:
-                # パースエラーの場合は前の状態を維持
-                states.append(states[-1])
-                
-        except (IndexError, ValueError, AttributeError):
-            # エラー時は前の状態を維持
-            states.append(states[-1])
-    
-    return states
+    """ステップ（Moveのリスト）から各状態を抽出"""
+    return path_states(steps)
 
 def create_visualization(states, steps, a, b, goal):
     """グラフ可視化を作成（Cloud対応版）"""
+    import matplotlib.pyplot as plt
+    import matplotlib.patches as mpatches
+    
+    apply_font_settings(font_settings)
     
     # 図のサイズ調整
     fig_height = max(6, len(states) * 0.6)
@@ -270,7 +120,7 @@ def create_visualization(states, steps, a, b, goal):
                 step_text = "Initial"
         elif i <= len(steps):
             # ステップの説明を短縮
-            step_desc = steps[i-1].split("→")[0].strip()
+            step_desc = describe_step(steps[i-1])
             if len(step_desc) > 15:
                 step_desc = step_desc[:12] + "..."
             step_text = f"Step{i}: {step_desc}"
@@ -342,6 +192,39 @@ def create_visualization(states, steps, a, b, goal):
     plt.tight_layout()
     return fig
 
+@st.cache_resource
+def get_solve_cache():
+    """セッション・再実行をまたいで共有する (a, b, goal) → 手順 のキャッシュ"""
+    return SolveCache()
+
+@st.cache_resource
+def get_render_cache():
+    """セッション・再実行をまたいで共有する描画済みグラフ（PNG）のキャッシュ"""
+    return RenderCache()
+
+# グラフ画像の書き出し設定（st.pyplot の既定値と同じ）
+RENDER_OPTIONS = {"format": "png", "dpi": 200, "bbox_inches": "tight"}
+
+def render_visualization_png(steps, a, b, goal):
+    """create_visualization の結果をPNGで返す（同じ条件なら再描画しない）"""
+    cache = get_render_cache()
+    language = "ja" if japanese_support else "en"
+    key = (a, b, goal, language, "cloud", tuple(sorted(RENDER_OPTIONS.items())))
+    png = cache.get(key)
+    if png is None:
+        import matplotlib.pyplot as plt
+        
+        states = extract_path_states(steps, a, b)
+        fig = create_visualization(states, steps, a, b, goal)
+        buffer = io.BytesIO()
+        try:
+            fig.savefig(buffer, **RENDER_OPTIONS)
+        finally:
+            plt.close(fig)
+        png = buffer.getvalue()
+        cache.put(key, png)
+    return png
+
 def main():
     """メインアプリケーション"""
     
@@ -395,7 +278,10 @@ def main():
         
         # 解を求める
         with st.spinner(spinner_text):
-            steps = solve_water_jug_problem(a, b, goal)
+            # gcdで割り、A/Bをそろえた代表の問題で解いてキャッシュを共有する
+            steps = solve_canonical(a, b, goal, lambda *key: get_solve_cache().get_or_compute(
+                key, lambda: solve_water_jug_problem(*key)
+            ))
         
         if steps:
             if japanese_support:
@@ -411,7 +297,7 @@ def main():
                     st.write("### 📝 Detailed Steps")
                 
                 for i, step in enumerate(steps, 1):
-                    st.write(f"**Step {i}:** {step}")
+                    st.write(f"**Step {i}:** {format_step(step)}")
             
             # グラフ表示
             if show_graph:
@@ -421,9 +307,8 @@ def main():
                     st.write("### 📈 Visual Steps")
                 
                 try:
-                    states = extract_path_states(steps, a, b)
-                    fig = create_visualization(states, steps, a, b, goal)
-                    st.pyplot(fig)
+                    png = render_visualization_png(steps, a, b, goal)
+                    st.image(png)
                 except Exception as e:
                     st.error(f"グラフ描画エラー / Graph error: {e}")
         else:
@@ -0,0 +1,96 @@
+# 水差しパズル - 一括ソルバー
+"""
+(a, b, goal) の問い合わせを大量にまとめて解くためのAPI（問題生成・難易度判定用）。
+
+1. NumPyの np.gcd で解の存在判定をまとめて行い、解けないものを除外する
+2. 同一の問い合わせと、gcd倍やA・Bの入れ替えで同じになる問い合わせを1つにまとめる
+3. 残りのBFSを ProcessPoolExecutor にチャンク単位で分配する
+4. 結果は入力と同じ順番で返す（解けないものは None）
+
+容量の範囲全体の解の存在判定だけが必要なら solvability_matrix を使う。
+"""
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from water_jug_solver import canonical_problem, restore_moves, solve_water_jug_problem
+
+# これより少ない件数ならプロセスを起動せずにその場で解く
+MIN_PARALLEL_TASKS = 32
+
+
+def solvable_mask(a, b, goal):
+    """配列で受け取った (a, b, goal) の解の存在判定をまとめて行う"""
+    a = np.asarray(a, dtype=np.int64)
+    b = np.asarray(b, dtype=np.int64)
+    goal = np.asarray(goal, dtype=np.int64)
+    g = np.gcd(a, b)
+    valid = (a > 0) & (b > 0) & (goal >= 0)
+    # gcdが0になる不正な入力で割り算しないよう1に置き換えておく
+    return valid & (goal <= np.maximum(a, b)) & (goal % np.where(g > 0, g, 1) == 0)
+
+
+def solvability_matrix(a_values, b_values, goal):
+    """a_values × b_values の全ての容量の組について goal を測れるかの真偽値行列（行がa、列がb）
+
+    rangeか配列を受け取り、np.gcd.outer とブロードキャストだけで判定する
+    （要素ごとに is_solvable を呼ぶループより桁違いに速い）。
+    goal に配列を渡すと、末尾の軸に目標量が並ぶ (len(a), len(b), len(goal)) の配列を返す。
+    """
+    a = np.asarray(a_values, dtype=np.int64).reshape(-1)
+    b = np.asarray(b_values, dtype=np.int64).reshape(-1)
+    goal = np.asarray(goal, dtype=np.int64)
+    g = np.gcd.outer(a, b)
+    largest = np.maximum.outer(a, b)
+    valid = np.logical_and.outer(a > 0, b > 0)
+    if goal.ndim:
+        # 目標量の軸を末尾に足してブロードキャストする
+        g, largest, valid = g[..., None], largest[..., None], valid[..., None]
+        goal = goal.reshape(-1)
+    return valid & (goal >= 0) & (goal <= largest) & (goal % np.where(valid, g, 1) == 0)
+
+
+def _solve_query(query):
+    return solve_water_jug_problem(*query)
+
+
+def solve_batch(queries, workers=None, chunksize=None):
+    """(a, b, goal) の並びをまとめて解き、入力順に手順（Moveのリスト）かNoneを返す"""
+    queries = [tuple(int(v) for v in q) for q in queries]
+    if not queries:
+        return []
+
+    columns = np.array(queries, dtype=np.int64).reshape(len(queries), 3)
+    mask = solvable_mask(columns[:, 0], columns[:, 1], columns[:, 2])
+
+    # 解ける問い合わせを代表の形にまとめる
+    canonical = []
+    tasks = {}
+    for query, ok in zip(queries, mask.tolist()):
+        if not ok:
+            canonical.append(None)
+            continue
+        key, g, swapped = canonical_problem(*query)
+        canonical.append((key, g, swapped))
+        tasks.setdefault(key, None)
+
+    keys = list(tasks)
+    workers = workers or os.cpu_count() or 1
+    if workers <= 1 or len(keys) < MIN_PARALLEL_TASKS:
+        solved = map(_solve_query, keys)
+        results = dict(zip(keys, solved))
+    else:
+        if chunksize is None:
+            chunksize = max(1, len(keys) // (workers * 4))
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            results = dict(zip(keys, executor.map(_solve_query, keys, chunksize=chunksize)))
+
+    output = []
+    for entry in canonical:
+        if entry is None:
+            output.append(None)
+            continue
+        key, g, swapped = entry
+        output.append(restore_moves(results[key], g, swapped))
+    return output
@@ -0,0 +1,171 @@
+# 水差しパズル - ベンチマーク
+"""
+ソルバー・状態抽出・グラフ描画の性能を容量のはしご（10〜10^6）で計測する。
+
+各項目について、実行時間・訪問した状態数・tracemallocによるピークメモリを表示する。
+時間とメモリは別々の実行で測る（tracemallocの計測自体が遅いため）。
+
+    python water_jug_bench.py                  # 表形式で表示
+    python water_jug_bench.py --max 10000      # 容量の上限を下げる
+    python water_jug_bench.py --json > bench_output.txt
+"""
+import argparse
+import contextlib
+import io
+import json
+import sys
+import time
+import tracemalloc
+import warnings
+
+# 容量のはしご: (A, B, 目標量) はAとBが互いに素で、手順の長さが容量に比例する組
+LADDER = [(n, n + 1, n // 2) for n in (10, 100, 1000, 10_000, 100_000, 1_000_000)]
+
+
+@contextlib.contextmanager
+def _record_tables(module):
+    """module内で作られた StateTable を記録する（訪問状態数を数えるため）"""
+    tables = []
+    original = module.StateTable
+
+    class RecordingTable(original):
+        __slots__ = ()
+
+        def __init__(self, *args, **kwargs):
+            super().__init__(*args, **kwargs)
+            tables.append(self)
+
+    module.StateTable = RecordingTable
+    try:
+        yield tables
+    finally:
+        module.StateTable = original
+
+
+def _measure(func, state_module=None, memory=True):
+    """funcの実行時間・訪問状態数・ピークメモリを測る"""
+    with contextlib.ExitStack() as stack:
+        tables = stack.enter_context(_record_tables(state_module)) if state_module else None
+        start = time.perf_counter()
+        result = func()
+        elapsed = time.perf_counter() - start
+    states = sum(t.count() for t in tables) if tables is not None else None
+
+    peak = None
+    if memory:
+        tracemalloc.start()
+        try:
+            func()
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+    return result, elapsed, states, peak
+
+
+def _render_png(create, options, plt):
+    """グラフを作ってPNGに書き出すまで（アプリの描画経路と同じ）"""
+    with warnings.catch_warnings():
+        # フォントにない文字の警告が描画のたびに出るので抑える
+        warnings.simplefilter("ignore")
+        fig = create()
+        try:
+            fig.savefig(io.BytesIO(), **options)
+        finally:
+            plt.close(fig)
+
+
+def benchmarks():
+    """(名前, 最大容量, 関数を作る関数, StateTableを探すモジュール) の一覧"""
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+
+    import streamlit_app
+    import streamlit_app_cloud
+    import water_jug_solver
+    import water_jug_test
+
+    # 状態抽出・描画の入力になる手順は計測の外で求める
+    app_steps = water_jug_solver.solve_water_jug_problem
+    cloud_steps = streamlit_app_cloud.solve_water_jug_problem
+
+    def app_extract(a, b, goal):
+        steps = app_steps(a, b, goal)
+        return lambda: streamlit_app.extract_path_states(steps, a, b)
+
+    def cloud_extract(a, b, goal):
+        steps = cloud_steps(a, b, goal)
+        return lambda: streamlit_app_cloud.extract_path_states(steps, a, b)
+
+    def app_render(a, b, goal):
+        steps = app_steps(a, b, goal)
+        states = streamlit_app.extract_path_states(steps, a, b)
+        create = lambda: streamlit_app.create_simple_visualization(states, steps, a, b, goal)
+        return lambda: _render_png(create, streamlit_app.RENDER_OPTIONS, plt)
+
+    def cloud_render(a, b, goal):
+        steps = cloud_steps(a, b, goal)
+        states = streamlit_app_cloud.extract_path_states(steps, a, b)
+        create = lambda: streamlit_app_cloud.create_visualization(states, steps, a, b, goal)
+        return lambda: _render_png(create, streamlit_app_cloud.RENDER_OPTIONS, plt)
+
+    return [
+        ("solve: streamlit_app", 10**6,
+         lambda a, b, goal: lambda: streamlit_app.solve_water_jug_problem(a, b, goal), water_jug_solver),
+        ("solve: cloud", 10**6,
+         lambda a, b, goal: lambda: streamlit_app_cloud.solve_water_jug_problem(a, b, goal), streamlit_app_cloud),
+        # 経路をキューごとにコピーするので大きな容量では扱えない
+        ("solve: water_jug_test", 1000,
+         lambda a, b, goal: lambda: water_jug_test.solve_water_jug_problem(a, b, goal), water_jug_test),
+        ("extract_path_states: streamlit_app", 10**6, app_extract, None),
+        ("extract_path_states: cloud", 10**6, cloud_extract, None),
+        ("render: create_simple_visualization", 10**5, app_render, None),
+        # 棒・文字・1Lごとの目盛りを1つずつ描くので大きな容量では扱えない
+        ("render: create_visualization", 100, cloud_render, None),
+    ]
+
+
+def run(max_capacity=10**6, memory=True, only=None):
+    """ベンチマークを実行し、1件ずつ結果の辞書を返す"""
+    for name, limit, make, state_module in benchmarks():
+        if only and only not in name:
+            continue
+        for a, b, goal in LADDER:
+            if a > min(limit, max_capacity):
+                continue
+            func = make(a, b, goal)
+            result, elapsed, states, peak = _measure(func, state_module, memory)
+            yield {
+                "name": name,
+                "a": a,
+                "b": b,
+                "goal": goal,
+                "wall_ms": round(elapsed * 1000, 2),
+                "states": states,
+                "peak_kib": None if peak is None else round(peak / 1024, 1),
+                "steps": len(result) if isinstance(result, list) else None,
+            }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="水差しパズルのベンチマーク")
+    parser.add_argument("--max", type=int, default=10**6, help="計測する最大の容量")
+    parser.add_argument("--only", help="名前にこの文字列を含む項目だけ計測する")
+    parser.add_argument("--no-memory", action="store_true", help="tracemallocによる計測を省く")
+    parser.add_argument("--json", action="store_true", help="1行1件のJSONで出力する")
+    args = parser.parse_args(argv)
+
+    if not args.json:
+        print(f"{'benchmark':<38} {'A':>8} {'B':>8} {'wall ms':>10} {'states':>9} {'peak KiB':>10} {'steps':>8}")
+    for row in run(args.max, not args.no_memory, args.only):
+        if args.json:
+            print(json.dumps(row), flush=True)
+        else:
+            cells = [row["states"], row["peak_kib"], row["steps"]]
+            states, peak, steps = ("-" if v is None else v for v in cells)
+            print(f"{row['name']:<38} {row['a']:>8} {row['b']:>8} {row['wall_ms']:>10} "
+                  f"{states:>9} {peak:>10} {steps:>8}", flush=True)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
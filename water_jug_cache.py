@@ -0,0 +1,196 @@
+# 水差しパズル - 解のメモ化キャッシュ
+"""
+(a, b, goal) をキーに解を保持する、件数上限（LRU）とTTL付きのキャッシュ。
+Streamlitの再実行やセッションをまたいで共有し、同じ設定を何度も解かないようにする。
+描画済みのグラフ画像は RenderCache に合計サイズの上限つきで保持する。
+キャッシュにまだない同じ計算が同時に来たときは SingleFlight で1回の実行にまとめる。
+
+件数上限とTTLは引数か環境変数で設定できる:
+    WATER_JUG_CACHE_MAX_ENTRIES (既定 256)
+    WATER_JUG_CACHE_TTL         (秒, 既定 3600, 0以下で無期限)
+"""
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+
+DEFAULT_MAX_ENTRIES = 256
+DEFAULT_TTL = 3600.0
+
+
+class SolveCache:
+    """スレッドセーフなLRU + TTLキャッシュ（ヒット/ミス数を記録）"""
+
+    def __init__(self, max_entries=None, ttl=None, clock=time.monotonic):
+        if max_entries is None:
+            max_entries = int(os.environ.get("WATER_JUG_CACHE_MAX_ENTRIES", DEFAULT_MAX_ENTRIES))
+        if ttl is None:
+            ttl = float(os.environ.get("WATER_JUG_CACHE_TTL", DEFAULT_TTL))
+        self.max_entries = max_entries
+        self.ttl = ttl if ttl > 0 else None
+        self._clock = clock
+        self._entries = OrderedDict()  # キー → (保存時刻, 値)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key, default=None):
+        """キャッシュされた値を返す（なければdefault）"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                stored_at, value = entry
+                if self.ttl is None or self._clock() - stored_at < self.ttl:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._entries[key]
+            self.misses += 1
+            return default
+
+    def put(self, key, value):
+        """値を保存し、上限を超えた分を古い順に捨てる"""
+        with self._lock:
+            self._entries[key] = (self._clock(), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def get_or_compute(self, key, compute):
+        """キャッシュになければcompute()で求めて保存する"""
+        missing = object()
+        value = self.get(key, missing)
+        if value is missing:
+            value = compute()
+            self.put(key, value)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        """ヒット/ミス数などの統計を辞書で返す"""
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl": self.ttl,
+            }
+
+
+DEFAULT_RENDER_CACHE_BYTES = 32 * 1024 * 1024
+
+
+class RenderCache:
+    """描画済み画像（PNGのバイト列）を合計サイズの上限つきで保持するLRUキャッシュ
+
+    上限は引数か環境変数 WATER_JUG_RENDER_CACHE_BYTES（既定 32MB）で設定する。
+    """
+
+    def __init__(self, max_bytes=None):
+        if max_bytes is None:
+            max_bytes = int(os.environ.get("WATER_JUG_RENDER_CACHE_BYTES", DEFAULT_RENDER_CACHE_BYTES))
+        self.max_bytes = max_bytes
+        self.total_bytes = 0
+        self._entries = OrderedDict()  # キー → PNGバイト列
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key):
+        """保存済みの画像を返す（なければNone）"""
+        with self._lock:
+            data = self._entries.get(key)
+            if data is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return data
+
+    def put(self, key, data):
+        """画像を保存し、合計サイズが上限を超えた分を古い順に捨てる"""
+        if len(data) > self.max_bytes:
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.total_bytes -= len(old)
+            self._entries[key] = data
+            self.total_bytes += len(data)
+            while self.total_bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self.total_bytes -= len(evicted)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.total_bytes = 0
+
+    def stats(self):
+        """ヒット/ミス数などの統計を辞書で返す"""
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "entries": len(self._entries),
+                "bytes": self.total_bytes,
+                "max_bytes": self.max_bytes,
+            }
+
+
+class SingleFlight:
+    """同じキーの計算が同時に来たら1回だけ実行し、結果を待っている全員に返す
+
+    最初の呼び出しが計算し、実行中に来た同じキーの呼び出しはその Future を待つ。
+    計算が例外で終わった場合は、待っていた呼び出しにも同じ例外を送る。
+    """
+
+    def __init__(self):
+        self._calls = {}  # キー → 実行中の計算の Future
+        self._lock = threading.Lock()
+        self.executions = 0
+        self.coalesced = 0
+
+    def do(self, key, compute):
+        """keyの計算が実行中ならその結果を待ち、なければcompute()を実行する"""
+        with self._lock:
+            future = self._calls.get(key)
+            leader = future is None
+            if leader:
+                future = self._calls[key] = Future()
+                self.executions += 1
+            else:
+                self.coalesced += 1
+        if not leader:
+            return future.result()
+        try:
+            value = compute()
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(value)
+            return value
+        finally:
+            with self._lock:
+                del self._calls[key]
+
+    def stats(self):
+        """実行回数とまとめた回数などの統計を辞書で返す"""
+        with self._lock:
+            return {
+                "executions": self.executions,
+                "coalesced": self.coalesced,
+                "in_flight": len(self._calls),
+            }
@@ -0,0 +1,143 @@
+# 水差しパズル - コマンドライン一括ソルバー
+"""
+標準入力かファイルから (a, b, goal) を1行ずつ読み、結果を1行1件のJSONで書き出す。
+Streamlitやmatplotlibを読み込まないので、シェルのパイプラインやcronから使える。
+
+入力は1行1件で、次のどの形式でもよい（空行と # で始まる行は読み飛ばす）:
+
+    5 3 4
+    5,3,4
+    [5, 3, 4]
+    {"a": 5, "b": 3, "goal": 4}
+
+    python water_jug_cli.py queries.txt
+    seq 1 100 | awk '{print $1, 97, 50}' | python water_jug_cli.py --workers 4
+
+結果は全件をメモリに溜めず、入力と同じ順番で1件ずつ書き出す。
+"""
+import argparse
+import json
+import sys
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+
+from water_jug_moves import OP_NAMES
+from water_jug_solver import is_solvable, solve_canonical
+
+# 並列実行時に先読みする件数（ワーカー1つあたり）
+PREFETCH_PER_WORKER = 64
+
+
+def parse_query(line):
+    """1行を (a, b, goal) に変換する（読み飛ばす行はNone、不正な行はValueError）"""
+    line = line.strip()
+    if not line or line.startswith("#"):
+        return None
+    if line[0] in "[{":
+        data = json.loads(line)
+        if isinstance(data, dict):
+            data = [data.get("a"), data.get("b"), data.get("goal")]
+        # int() に任せると 1.7 や true が黙って 1 になるので、JSONの整数だけを受け付ける
+        # （キーの欠けた None や配列・オブジェクトもここで弾く）
+        if not isinstance(data, list) or not all(type(v) is int for v in data):
+            raise ValueError(f"expected 3 integer values (a, b, goal): {line!r}")
+    else:
+        data = line.replace(",", " ").split()
+    if len(data) != 3:
+        raise ValueError(f"expected 3 values (a, b, goal): {line!r}")
+    a, b, goal = (int(v) for v in data)
+    if a <= 0 or b <= 0 or goal < 0:
+        raise ValueError(f"capacities must be positive and goal non-negative: {line!r}")
+    return a, b, goal
+
+
+def result_record(a, b, goal, steps):
+    """1件分の出力用の辞書（stepsはMoveのリストかNone）"""
+    result = {"a": a, "b": b, "goal": goal, "solvable": steps is not None}
+    if steps is not None:
+        result["step_count"] = len(steps)
+        result["moves"] = [
+            {
+                "op": OP_NAMES[m.op],
+                "from": m.source,
+                "to": m.target,
+                "amount": m.amount,
+                "state": list(m.state),
+            }
+            for m in steps
+        ]
+    return result
+
+
+def solve_query(query):
+    """1件を解いて出力用の辞書を返す（プロセスプールからも呼ばれる）"""
+    a, b, goal = query
+    steps = solve_canonical(a, b, goal) if is_solvable(a, b, goal) else None
+    return result_record(a, b, goal, steps)
+
+
+def _read_queries(lines):
+    """(行番号, 問い合わせ) か (行番号, エラー文字列) を順に返す"""
+    for lineno, line in enumerate(lines, 1):
+        try:
+            query = parse_query(line)
+        except ValueError as e:
+            yield lineno, None, str(e)
+            continue
+        if query is not None:
+            yield lineno, query, None
+
+
+def _bounded_map(executor, func, items, window):
+    """executor.map と同じく順番通りに返すが、同時に抱える件数をwindowまでに抑える"""
+    pending = deque()
+    items = iter(items)
+    for item in islice(items, window):
+        pending.append(executor.submit(func, item))
+    while pending:
+        yield pending.popleft().result()
+        for item in islice(items, 1):
+            pending.append(executor.submit(func, item))
+
+
+def _solve_entry(entry):
+    lineno, query, error = entry
+    if error is not None:
+        return {"line": lineno, "error": error}
+    return solve_query(query)
+
+
+def iter_results(lines, workers=1):
+    """入力行を順に解き、出力用の辞書を1件ずつ返す"""
+    entries = _read_queries(lines)
+    if workers <= 1:
+        yield from map(_solve_entry, entries)
+        return
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        yield from _bounded_map(executor, _solve_entry, entries, workers * PREFETCH_PER_WORKER)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="水差しパズルを一括で解き、1行1件のJSONで出力する")
+    parser.add_argument("input", nargs="?", default="-", help="入力ファイル（省略時または - で標準入力）")
+    parser.add_argument("-w", "--workers", type=int, default=1, help="並列に解くプロセス数（既定: 1）")
+    args = parser.parse_args(argv)
+
+    source = sys.stdin if args.input == "-" else open(args.input, encoding="utf-8")
+    failed = False
+    try:
+        with source:
+            for result in iter_results(source, args.workers):
+                failed = failed or "error" in result
+                sys.stdout.write(json.dumps(result, separators=(",", ":")) + "\n")
+                sys.stdout.flush()
+    except BrokenPipeError:
+        # head などで読み手が先に閉じた場合は静かに終える
+        sys.stderr.close()
+        return 0
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,375 @@
+# 水差しパズル - ディスク上の解キャッシュ
+"""
+解（手順）をSQLiteのファイルに保存し、プロセスの再起動や複数のStreamlitプロセスをまたいで共有する。
+
+- キーは canonical_problem で正規化した (a, b, goal)（gcdで割り、a <= b にそろえたもの）
+- 手順は1手1バイトの操作番号（0〜5）の列として保存し、読み出し時に元の容量で状態を再計算する
+- WALモードで開くので、書き込み中も他のプロセスは読み出せる
+- 合計サイズが上限を超えたら、最後に使われた時刻が古いものから削除する
+  （件数と合計サイズは totals 表に書き込みと同じトランザクションで足し引きし、表全体は数えない）
+
+保存先と上限は引数か環境変数で設定できる:
+    WATER_JUG_DISK_CACHE        (既定 ~/.cache/water_jug_puzzle/solutions.sqlite3)
+    WATER_JUG_DISK_CACHE_BYTES  (既定 64MB)
+
+事前の作成（ウォームアップ）と書き出し:
+
+    python water_jug_disk_cache.py warm --max-capacity 20
+    python water_jug_disk_cache.py warm queries.txt
+    python water_jug_disk_cache.py export > solutions.jsonl
+    python water_jug_disk_cache.py stats
+"""
+import argparse
+import json
+import os
+import sqlite3
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+from water_jug_solver import (
+    _OPERATIONS,
+    _make_move,
+    canonical_problem,
+    is_solvable,
+    solve_water_jug_problem,
+)
+
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+
+# 1件あたりの手順以外の保存コスト（キー・時刻・索引）の見積もり
+ROW_OVERHEAD = 48
+
+# 最後に使われた時刻をこれより短い間隔では書き換えない（読み出しのたびに書き込まないため）
+TOUCH_INTERVAL = 60.0
+
+# 書き込み待ちの上限（秒）。時刻の更新は取れなければ諦めるので、読み出しを待たせない短さにする
+BUSY_TIMEOUT = 30.0
+TOUCH_BUSY_TIMEOUT = 0.05
+
+# 上限を超えたときは、この割合まで減らす
+EVICT_TO = 0.9
+
+# (操作の種類, 操作した容器, 移し先の容器) → 操作番号
+_OP_CODES = {operation: op for op, operation in enumerate(_OPERATIONS)}
+
+# A・Bを入れ替えたときの操作番号の対応（0↔1, 2↔3, 4↔5）
+_MIRROR_OPS = bytes(op ^ 1 for op in range(256))
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS solutions (
+    a INTEGER NOT NULL,
+    b INTEGER NOT NULL,
+    goal INTEGER NOT NULL,
+    moves BLOB,
+    size INTEGER NOT NULL,
+    last_used REAL NOT NULL,
+    PRIMARY KEY (a, b, goal)
+);
+CREATE INDEX IF NOT EXISTS solutions_last_used ON solutions (last_used);
+CREATE TABLE IF NOT EXISTS totals (
+    id INTEGER PRIMARY KEY CHECK (id = 0),
+    entries INTEGER NOT NULL,
+    bytes INTEGER NOT NULL
+);
+"""
+
+
+def default_path():
+    """キャッシュファイルの保存先"""
+    path = os.environ.get("WATER_JUG_DISK_CACHE")
+    if path:
+        return path
+    cache_home = os.environ.get("XDG_CACHE_HOME") or os.path.expanduser("~/.cache")
+    return os.path.join(cache_home, "water_jug_puzzle", "solutions.sqlite3")
+
+
+@contextmanager
+def _transaction(conn):
+    """書き込みロックを取ってから読み書きするトランザクション（他のプロセスと合計がずれないように）"""
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        yield conn
+    except BaseException:
+        conn.execute("ROLLBACK")
+        raise
+    conn.execute("COMMIT")
+
+
+def encode_moves(moves):
+    """手順を操作番号のバイト列にする"""
+    return bytes(_OP_CODES[m.op, m.source, m.target] for m in moves)
+
+
+def decode_moves(data, a, b):
+    """操作番号のバイト列を (0, 0) から再生してMoveのリストに戻す"""
+    capacities = (a, b)
+    moves = []
+    state = (0, 0)
+    for op in data:
+        _, source, target = _OPERATIONS[op]
+        next_state = list(state)
+        if source == target:
+            next_state[source] = capacities[source] if op < 2 else 0
+        else:
+            pour = min(state[source], capacities[target] - state[target])
+            next_state[source] -= pour
+            next_state[target] += pour
+        next_state = tuple(next_state)
+        moves.append(_make_move(op, state, next_state))
+        state = next_state
+    return moves
+
+
+class DiskSolveCache:
+    """SolveCache と同じ使い方ができる、SQLiteに保存する解のキャッシュ
+
+    接続はスレッドごとに開く。SQLiteのエラーはキャッシュの失敗として扱い、
+    読み出しはミス、書き込みは何もしなかったことにする（解くこと自体は止めない）。
+    """
+
+    def __init__(self, path=None, max_bytes=None, clock=time.time):
+        if max_bytes is None:
+            max_bytes = int(os.environ.get("WATER_JUG_DISK_CACHE_BYTES", DEFAULT_MAX_BYTES))
+        self.path = path or default_path()
+        self.max_bytes = max_bytes
+        self._clock = clock
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.errors = 0
+
+    def _connect(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=BUSY_TIMEOUT, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(_SCHEMA)
+            if conn.execute("SELECT 1 FROM totals").fetchone() is None:
+                # 合計を持っていない（以前の形式の）ファイルは最初に1回だけ数える
+                with _transaction(conn):
+                    conn.execute(
+                        "INSERT OR IGNORE INTO totals (id, entries, bytes) "
+                        "SELECT 0, COUNT(*), COALESCE(SUM(size), 0) FROM solutions"
+                    )
+            self._local.conn = conn
+        return conn
+
+    def _count(self, name):
+        with self._lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+    def get(self, key, default=None):
+        """保存された手順を返す（なければdefault、解なしはNone）"""
+        a, b, _ = key
+        canonical, _, swapped = canonical_problem(*key)
+        try:
+            conn = self._connect()
+            row = conn.execute(
+                "SELECT moves, last_used FROM solutions WHERE a = ? AND b = ? AND goal = ?",
+                canonical,
+            ).fetchone()
+        except (OSError, sqlite3.Error):
+            self._count("errors")
+            row = None
+        if row is None:
+            self._count("misses")
+            return default
+        if self._clock() - row[1] > TOUCH_INTERVAL:
+            self._touch(conn, canonical)
+        self._count("hits")
+        data = row[0]
+        if data is None:
+            return None
+        # 操作番号はgcd倍しても変わらないので、元の容量でそのまま再生できる
+        if swapped:
+            data = bytes(data).translate(_MIRROR_OPS)
+        return decode_moves(data, a, b)
+
+    def _touch(self, conn, canonical):
+        # 最後に使われた時刻の更新は読み出しのついで（他のプロセスが書き込み中なら待たずに諦める）
+        try:
+            conn.execute(f"PRAGMA busy_timeout = {int(TOUCH_BUSY_TIMEOUT * 1000)}")
+            try:
+                conn.execute(
+                    "UPDATE solutions SET last_used = ? WHERE a = ? AND b = ? AND goal = ?",
+                    (self._clock(), *canonical),
+                )
+            finally:
+                conn.execute(f"PRAGMA busy_timeout = {int(BUSY_TIMEOUT * 1000)}")
+        except (OSError, sqlite3.Error):
+            pass
+
+    def put(self, key, moves):
+        """手順（Noneなら解なし）を保存し、上限を超えた分を古い順に消す"""
+        canonical, _, swapped = canonical_problem(*key)
+        data = None if moves is None else encode_moves(moves)
+        if swapped and data is not None:
+            data = data.translate(_MIRROR_OPS)
+        size = ROW_OVERHEAD + (len(data) if data is not None else 0)
+        if size > self.max_bytes:
+            return
+        try:
+            with _transaction(self._connect()) as conn:
+                old = conn.execute(
+                    "SELECT size FROM solutions WHERE a = ? AND b = ? AND goal = ?", canonical
+                ).fetchone()
+                conn.execute(
+                    "INSERT OR REPLACE INTO solutions (a, b, goal, moves, size, last_used) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    (*canonical, data, size, self._clock()),
+                )
+                if old is None:
+                    conn.execute("UPDATE totals SET entries = entries + 1, bytes = bytes + ?", (size,))
+                else:
+                    conn.execute("UPDATE totals SET bytes = bytes + ?", (size - old[0],))
+                self._evict(conn)
+        except (OSError, sqlite3.Error):
+            self._count("errors")
+
+    def _evict(self, conn):
+        total = conn.execute("SELECT bytes FROM totals").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        excess = total - int(self.max_bytes * EVICT_TO)
+        victims = []
+        freed = 0
+        for a, b, goal, size in conn.execute(
+            "SELECT a, b, goal, size FROM solutions ORDER BY last_used"
+        ):
+            victims.append((a, b, goal))
+            freed += size
+            if freed >= excess:
+                break
+        conn.executemany("DELETE FROM solutions WHERE a = ? AND b = ? AND goal = ?", victims)
+        conn.execute(
+            "UPDATE totals SET entries = entries - ?, bytes = bytes - ?", (len(victims), freed)
+        )
+        with self._lock:
+            self.evictions += len(victims)
+
+    def get_or_compute(self, key, compute):
+        """保存されていなければcompute()で求めて保存する"""
+        missing = object()
+        value = self.get(key, missing)
+        if value is missing:
+            value = compute()
+            self.put(key, value)
+        return value
+
+    def items(self):
+        """保存されている (a, b, goal, 手順) を順に返す（書き出し用）"""
+        conn = self._connect()
+        for a, b, goal, data in conn.execute("SELECT a, b, goal, moves FROM solutions ORDER BY a, b, goal"):
+            yield a, b, goal, None if data is None else decode_moves(data, a, b)
+
+    def clear(self):
+        with _transaction(self._connect()) as conn:
+            conn.execute("DELETE FROM solutions")
+            conn.execute("UPDATE totals SET entries = 0, bytes = 0")
+        conn.execute("VACUUM")
+
+    def stats(self):
+        """ヒット/ミス数と保存件数・合計サイズを辞書で返す"""
+        try:
+            entries, total = self._connect().execute("SELECT entries, bytes FROM totals").fetchone()
+        except (OSError, sqlite3.Error):
+            entries, total = None, None
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "errors": self.errors,
+                "entries": entries,
+                "bytes": total,
+                "max_bytes": self.max_bytes,
+                "path": self.path,
+            }
+
+
+def _grid_queries(max_capacity):
+    """a <= b <= max_capacity の全ての解ける (a, b, goal)"""
+    for b in range(1, max_capacity + 1):
+        for a in range(1, b + 1):
+            for goal in range(1, b + 1):
+                if is_solvable(a, b, goal):
+                    yield a, b, goal
+
+
+def warm(cache, queries):
+    """問い合わせを解いてキャッシュに保存する（保存済みのものは解かない）、新しく解いた件数を返す"""
+    missing = object()
+    solved = 0
+    for query in queries:
+        if cache.get(query, missing) is missing:
+            cache.put(query, solve_water_jug_problem(*query))
+            solved += 1
+    return solved
+
+
+def _valid_queries(lines, errors):
+    """正しい行の問い合わせを順に返す（不正な行は標準エラーに報告し、errors に行番号を加えて読み飛ばす）"""
+    from water_jug_cli import _read_queries
+
+    for lineno, query, error in _read_queries(lines):
+        if error is None:
+            yield query
+        else:
+            print(f"line {lineno}: {error}", file=sys.stderr)
+            errors.append(lineno)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="水差しパズルの解キャッシュ（SQLite）の管理")
+    parser.add_argument("--path", help="キャッシュファイル（既定: WATER_JUG_DISK_CACHE か ~/.cache 以下）")
+    commands = parser.add_subparsers(dest="command", required=True)
+    warm_parser = commands.add_parser("warm", help="問い合わせを解いて保存する")
+    warm_parser.add_argument("input", nargs="?", help="1行1件の (a, b, goal)（water_jug_cli.py と同じ形式）")
+    warm_parser.add_argument("--max-capacity", type=int, help="a <= b <= この値の全ての問い合わせを解く")
+    export_parser = commands.add_parser("export", help="保存済みの解を1行1件のJSONで書き出す")
+    export_parser.add_argument("output", nargs="?", default="-", help="出力ファイル（省略時は標準出力）")
+    commands.add_parser("stats", help="保存件数と合計サイズを表示する")
+    commands.add_parser("clear", help="保存済みの解を全て消す")
+    args = parser.parse_args(argv)
+
+    cache = DiskSolveCache(args.path)
+    failed = False
+    if args.command == "warm":
+        if args.input:
+            with open(args.input, encoding="utf-8") as f:
+                errors = []
+                solved = warm(cache, _valid_queries(f, errors))
+            failed = bool(errors)
+        elif args.max_capacity:
+            solved = warm(cache, _grid_queries(args.max_capacity))
+        else:
+            parser.error("warm には入力ファイルか --max-capacity が必要です")
+        print(f"solved {solved} new queries", file=sys.stderr)
+    elif args.command == "export":
+        from water_jug_cli import result_record
+
+        output = sys.stdout if args.output == "-" else open(args.output, "w", encoding="utf-8")
+        try:
+            with output:
+                for a, b, goal, moves in cache.items():
+                    output.write(json.dumps(result_record(a, b, goal, moves), separators=(",", ":")) + "\n")
+        except BrokenPipeError:
+            # head などで読み手が先に閉じた場合は静かに終える
+            sys.stderr.close()
+            return 0
+    elif args.command == "clear":
+        cache.clear()
+    print(json.dumps(cache.stats(), ensure_ascii=False), file=sys.stdout if args.command == "stats" else sys.stderr)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
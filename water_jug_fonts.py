@@ -0,0 +1,182 @@
+# 水差しパズル - 日本語フォント設定の検出と保存
+"""
+日本語フォントが使えるかどうかの検出を1回だけ行い、結果を小さなJSON（マニフェスト）に保存する。
+
+検出結果はインストール済みフォントの指紋（フォントファイルの一覧・サイズ・更新時刻、
+matplotlib / japanize-matplotlib のバージョン、Cloud環境かどうか）に紐づけて保存し、
+指紋が変わらない限りプロセス起動時はマニフェストを読むだけで済ませる
+（フォントキャッシュの再構築やテスト描画を毎回行わない）。
+
+マニフェストの場所は環境変数 WATER_JUG_FONT_MANIFEST で変更できる。
+コンテナイメージの作成時に次のコマンドで事前に作っておくとよい:
+
+    python water_jug_fonts.py
+"""
+import hashlib
+import json
+import os
+import platform
+import sys
+from functools import lru_cache
+from importlib import metadata, util
+
+FONT_EXTENSIONS = (".ttf", ".otf", ".ttc")
+
+# 指紋の対象にするフォントディレクトリ
+FONT_DIRS = (
+    "/usr/share/fonts",
+    "/usr/local/share/fonts",
+    "~/.fonts",
+    "~/.local/share/fonts",
+    "/Library/Fonts",
+    "/System/Library/Fonts",
+    "~/Library/Fonts",
+    os.path.join(os.environ.get("WINDIR", "C:/Windows"), "Fonts"),
+)
+
+LOCAL_JAPANESE_FONTS = ("Noto Sans JP", "BIZ UDGothic", "Yu Gothic", "Meiryo", "MS Gothic", "Hiragino Sans")
+FALLBACK_FAMILY = ["DejaVu Sans", "sans-serif"]
+
+
+def manifest_path():
+    """マニフェストの保存先"""
+    path = os.environ.get("WATER_JUG_FONT_MANIFEST")
+    if path:
+        return path
+    cache_home = os.environ.get("XDG_CACHE_HOME") or os.path.expanduser("~/.cache")
+    return os.path.join(cache_home, "water_jug_puzzle", "font_manifest.json")
+
+
+def is_cloud_environment():
+    """Streamlit Cloud / Heroku などのクラウド環境かどうか"""
+    return bool(
+        os.environ.get("STREAMLIT_SERVER_PORT")
+        or "streamlit" in platform.platform().lower()
+        or os.environ.get("DYNO")  # Heroku
+    )
+
+
+def _package_version(name):
+    try:
+        return metadata.version(name)
+    except metadata.PackageNotFoundError:
+        return None
+
+
+def _font_dirs():
+    dirs = [os.path.expanduser(d) for d in FONT_DIRS]
+    # japanize-matplotlib 同梱のフォント（importせずに場所だけ調べる）
+    spec = util.find_spec("japanize_matplotlib")
+    if spec is not None and spec.origin:
+        dirs.append(os.path.join(os.path.dirname(spec.origin), "fonts"))
+    return dirs
+
+
+def font_fingerprint():
+    """インストール済みフォントの指紋（matplotlibを読み込まずに計算する）"""
+    digest = hashlib.sha1()
+    digest.update(repr((
+        _package_version("matplotlib"),
+        _package_version("japanize-matplotlib"),
+        is_cloud_environment(),
+    )).encode())
+    for root_dir in _font_dirs():
+        if not os.path.isdir(root_dir):
+            continue
+        for root, dirs, files in os.walk(root_dir):
+            dirs.sort()
+            for name in sorted(files):
+                if not name.lower().endswith(FONT_EXTENSIONS):
+                    continue
+                try:
+                    stat = os.stat(os.path.join(root, name))
+                except OSError:
+                    continue
+                digest.update(f"{root}/{name}:{stat.st_size}:{int(stat.st_mtime)}\n".encode())
+    return digest.hexdigest()
+
+
+def detect_font_settings():
+    """日本語フォントの利用可否を実際に調べる（matplotlibを読み込むので重い）"""
+    is_cloud = is_cloud_environment()
+    try:
+        import japanize_matplotlib  # noqa: F401  同梱フォントを登録する
+    except ImportError:
+        if is_cloud:
+            return {"japanese_support": False, "source": "fallback", "font_family": FALLBACK_FAMILY}
+        # ローカル環境: 利用可能なフォントを検索
+        import matplotlib.font_manager as fm
+
+        available_fonts = {f.name for f in fm.fontManager.ttflist}
+        for font in LOCAL_JAPANESE_FONTS:
+            if font in available_fonts:
+                return {"japanese_support": True, "source": "system", "font_family": [font, "sans-serif"]}
+        return {"japanese_support": False, "source": "fallback", "font_family": FALLBACK_FAMILY}
+    except Exception:
+        return {"japanese_support": False, "source": "fallback", "font_family": FALLBACK_FAMILY}
+
+    if is_cloud:
+        family = ["Noto Sans CJK JP", "DejaVu Sans", "sans-serif"]
+    else:
+        family = ["Noto Sans JP", "BIZ UDGothic", "Yu Gothic", "sans-serif"]
+    return {"japanese_support": True, "source": "japanize", "font_family": family}
+
+
+def _read_manifest(path):
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _write_manifest(path, manifest):
+    """一時ファイル経由で書き込む（書けない環境では何もしない）"""
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(manifest, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, path)
+    except OSError:
+        pass
+
+
+def build_manifest(path=None):
+    """検出を実行してマニフェストを書き出す"""
+    path = path or manifest_path()
+    manifest = dict(detect_font_settings(), fingerprint=font_fingerprint())
+    _write_manifest(path, manifest)
+    return manifest
+
+
+@lru_cache(maxsize=None)
+def load_font_settings(path=None):
+    """フォント設定を返す（指紋が一致すればマニフェストを読むだけ、違えば検出し直す）"""
+    path = path or manifest_path()
+    manifest = _read_manifest(path)
+    if manifest is not None and manifest.get("fingerprint") == font_fingerprint():
+        return manifest
+    return build_manifest(path)
+
+
+def apply_font_settings(settings):
+    """検出済みの設定をmatplotlibに反映する（グラフを描く直前に呼ぶ）"""
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+
+    if settings["source"] == "japanize":
+        try:
+            import japanize_matplotlib  # noqa: F401
+        except ImportError:
+            pass
+    plt.rcParams["font.family"] = list(settings["font_family"])
+    plt.rcParams["axes.unicode_minus"] = False
+    if settings["source"] == "japanize":
+        plt.rcParams["font.size"] = 10
+
+
+if __name__ == "__main__":
+    result = build_manifest(sys.argv[1] if len(sys.argv) > 1 else None)
+    print(json.dumps(result, ensure_ascii=False, indent=2))
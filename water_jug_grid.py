@@ -0,0 +1,55 @@
+# 水差しパズル - 状態グリッドの最短手数
+"""
+容量 (a, b) の全状態 (x, y) について、(0, 0) からの最短手数を一度に求める。
+
+solve_water_jug_problem と同じ6種類の操作を、BFSの各段のフロンティア全体に
+NumPyの配列演算でまとめて適用する（段ごとにPythonのループは1回だけ）。
+結果は形が (a+1, b+1) の int32 配列で、到達できない状態は UNREACHABLE になる。
+配列は (a+1)*(b+1) 要素を確保するので、大きな容量では使わないこと。
+"""
+import numpy as np
+
+UNREACHABLE = -1
+
+
+def _successors(x, y, a, b):
+    """フロンティア (x, y) の各状態に6種類の操作を適用した全ての次状態"""
+    pour_ab = np.minimum(x, b - y)
+    pour_ba = np.minimum(y, a - x)
+    full_a = np.full_like(x, a)
+    full_b = np.full_like(y, b)
+    zeros = np.zeros_like(x)
+    # 操作1〜6: Aを満たす, Bを満たす, Aを空にする, Bを空にする, A→B, B→A
+    next_x = np.concatenate([full_a, x, zeros, x, x - pour_ab, x + pour_ba])
+    next_y = np.concatenate([y, full_b, y, zeros, y + pour_ab, y - pour_ba])
+    return next_x, next_y
+
+
+def distance_grid(a, b):
+    """(0, 0) から各状態 (x, y) への最短手数の配列（形 (a+1, b+1)、到達不能は UNREACHABLE）"""
+    distance = np.full((a + 1, b + 1), UNREACHABLE, dtype=np.int32)
+    flat = distance.reshape(-1)
+    width = b + 1
+    distance[0, 0] = 0
+    x = np.zeros(1, dtype=np.int64)
+    y = np.zeros(1, dtype=np.int64)
+    depth = 0
+    while x.size:
+        depth += 1
+        next_x, next_y = _successors(x, y, a, b)
+        codes = np.unique(next_x * width + next_y)
+        codes = codes[flat[codes] == UNREACHABLE]
+        flat[codes] = depth
+        x, y = np.divmod(codes, width)
+    return distance
+
+
+def goal_distances(grid):
+    """水量ごとの最短手数（どちらかの容器がその水量になる状態の最小手数、到達不能は UNREACHABLE）"""
+    a, b = grid.shape[0] - 1, grid.shape[1] - 1
+    reached = np.where(grid == UNREACHABLE, np.iinfo(np.int32).max, grid)
+    best = np.full(max(a, b) + 1, np.iinfo(np.int32).max, dtype=np.int32)
+    best[: a + 1] = reached.min(axis=1)
+    best[: b + 1] = np.minimum(best[: b + 1], reached.min(axis=0))
+    best[best == np.iinfo(np.int32).max] = UNREACHABLE
+    return best
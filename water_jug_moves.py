@@ -0,0 +1,103 @@
+# 水差しパズル - 操作レコード
+"""
+ソルバーが返す手順の1手を表すレコードと、表示用の文字列への変換。
+文字列は表示する時にだけ作り、グラフ用の状態はレコードから直接取り出す。
+"""
+from typing import NamedTuple, Tuple
+
+# 操作の種類
+FILL = 0
+EMPTY = 1
+POUR = 2
+
+
+class Move(NamedTuple):
+    """1手分の操作
+
+    op:     FILL / EMPTY / POUR
+    source: 操作した容器の番号（0=A, 1=B, ...）
+    target: 移し先の容器の番号（FILL / EMPTY では source と同じ）
+    amount: 動いた水の量（汲んだ量・捨てた量・移した量）
+    state:  操作後の各容器の水量
+    """
+
+    op: int
+    source: int
+    target: int
+    amount: int
+    state: Tuple[int, ...]
+
+
+def jug_name(index):
+    """容器の表示名（A, B, C, ...）"""
+    return chr(ord("A") + index)
+
+
+def move_between(prev, state, capacities):
+    """前後の状態から操作を復元する（1手で移れない組み合わせはNone）"""
+    changed = [i for i, (x, y) in enumerate(zip(prev, state)) if x != y]
+    if len(changed) == 1:
+        i = changed[0]
+        if state[i] == capacities[i]:
+            return Move(FILL, i, i, state[i] - prev[i], tuple(state))
+        if state[i] == 0:
+            return Move(EMPTY, i, i, prev[i], tuple(state))
+    elif len(changed) == 2:
+        i, j = changed
+        if state[i] > prev[i]:
+            i, j = j, i
+        amount = prev[i] - state[i]
+        if state[j] - prev[j] == amount and (state[i] == 0 or state[j] == capacities[j]):
+            return Move(POUR, i, j, amount, tuple(state))
+    return None
+
+
+def path_states(moves, jugs=2):
+    """初期状態と各手の後の状態のリスト"""
+    return [(0,) * jugs] + [move.state for move in moves]
+
+
+def describe_move(move):
+    """操作部分だけの表示用文字列（例: AからBに2L移す）"""
+    if move.op == FILL:
+        return f"{jug_name(move.source)}容器を満たす"
+    if move.op == EMPTY:
+        return f"{jug_name(move.source)}容器を空にする"
+    return f"{jug_name(move.source)}から{jug_name(move.target)}に{move.amount}L移す"
+
+
+def format_state(state):
+    """状態の表示用文字列（例: (1L, 5L)）"""
+    return "(" + ", ".join(f"{v}L" for v in state) + ")"
+
+
+def format_move(move):
+    """1手の表示用文字列（例: AからBに2L移す → (1L, 5L)）"""
+    return f"{describe_move(move)} → {format_state(move.state)}"
+
+
+def step_columns(moves, indices, describe=describe_move):
+    """指定した手（0始まりの番号）だけを列ごとのリストにまとめる（st.dataframe 用）
+
+    表示する範囲の分だけ文字列を作るので、長い手順でも送るデータは表示行数に比例する。
+    """
+    indices = list(indices)
+    jugs = len(moves[0].state) if moves else 0
+    columns = {
+        "Step": [i + 1 for i in indices],
+        "Operation": [describe(moves[i]) for i in indices],
+    }
+    for j in range(jugs):
+        columns[f"{jug_name(j)} (L)"] = [moves[i].state[j] for i in indices]
+    return columns
+
+
+# 操作の英語名（検索・JSON出力用）
+OP_NAMES = ("fill", "empty", "pour")
+
+
+def search_moves(moves, text, describe=describe_move):
+    """表示用文字列か操作の英語名に text を含む手の番号（0始まり）のリスト（大文字・小文字は区別しない）"""
+    text = text.strip().lower()
+    return [i for i, move in enumerate(moves)
+            if text in f"{OP_NAMES[move.op]} {describe(move)} → {format_state(move.state)}".lower()]
@@ -0,0 +1,163 @@
+# 水差しパズル - N容器版ソルバー
+"""
+3〜6個程度の容器を扱う水差しパズルのBFSソルバー。
+
+- 状態は各容器の水量を混合基数でパックした整数1つで表す
+- 操作は「満たす」「空にする」「容器iから容器jに移す」（任意の順序対）
+- 同じ容量の容器は区別せず、水量を昇順に並べた状態を代表として扱う
+  （対称な状態をまとめることで探索する状態数を大きく減らす）
+"""
+from collections import deque
+from functools import reduce
+from math import gcd
+
+from water_jug_moves import EMPTY, FILL, POUR, Move
+from water_jug_state import StateTable
+
+# 操作番号に収まる最大の容器数（n^2 + 2n - 1 < water_jug_state.ROOT_OP）
+MAX_JUGS = 14
+
+
+def is_solvable_n(capacities, goal):
+    """N容器で目標量を作れるかを全容量のGCDで判定"""
+    if not capacities or goal > max(capacities):
+        return False
+    return goal % reduce(gcd, capacities) == 0
+
+
+class _JugSpace:
+    """容量を昇順に並べ替えた内部表現での状態空間"""
+
+    def __init__(self, capacities):
+        # 同じ容量の容器が隣り合うように並べ替える（order[k] = 元の容器番号）
+        self.order = sorted(range(len(capacities)), key=lambda i: capacities[i])
+        self.caps = [capacities[i] for i in self.order]
+        self.n = len(self.caps)
+
+        # 混合基数の桁の重み
+        self.strides = []
+        size = 1
+        for cap in self.caps:
+            self.strides.append(size)
+            size *= cap + 1
+        self.size = size
+
+        # 同じ容量が続く区間 [start, end)
+        self.groups = []
+        start = 0
+        for k in range(1, self.n + 1):
+            if k == self.n or self.caps[k] != self.caps[start]:
+                if k - start > 1:
+                    self.groups.append((start, k))
+                start = k
+
+    def encode(self, vols):
+        return sum(v * s for v, s in zip(vols, self.strides))
+
+    def decode(self, code):
+        vols = []
+        for cap in self.caps:
+            code, v = divmod(code, cap + 1)
+            vols.append(v)
+        return vols
+
+    def canonical(self, vols):
+        """同じ容量の容器の水量を昇順に並べた代表状態"""
+        for start, end in self.groups:
+            vols[start:end] = sorted(vols[start:end])
+        return vols
+
+    def move_code(self, kind, i, j=0):
+        """操作 (種類, i, j) を1バイトの操作番号に変換"""
+        if kind == FILL:
+            return i
+        if kind == EMPTY:
+            return self.n + i
+        return 2 * self.n + i * self.n + j
+
+    def move_of(self, op):
+        """操作番号を (種類, i, j) に戻す（種類は FILL / EMPTY / POUR）"""
+        if op < self.n:
+            return FILL, op, op
+        if op < 2 * self.n:
+            return EMPTY, op - self.n, op - self.n
+        i, j = divmod(op - 2 * self.n, self.n)
+        return POUR, i, j
+
+    def successors(self, vols):
+        """(次の状態の水量リスト, 操作番号) を列挙"""
+        caps = self.caps
+        for i, v in enumerate(vols):
+            if v < caps[i]:
+                nxt = list(vols)
+                nxt[i] = caps[i]
+                yield nxt, self.move_code(FILL, i)
+            if v > 0:
+                nxt = list(vols)
+                nxt[i] = 0
+                yield nxt, self.move_code(EMPTY, i)
+                for j, w in enumerate(vols):
+                    if j != i and w < caps[j]:
+                        pour = min(v, caps[j] - w)
+                        nxt = list(vols)
+                        nxt[i] -= pour
+                        nxt[j] += pour
+                        yield nxt, self.move_code(POUR, i, j)
+
+
+def _rebuild_n_path(space, table, code):
+    """代表状態の親リンクを具体的な容器番号のMoveのリストに戻す"""
+    vols = [0] * space.n
+    path = []
+    for _, _, op in table.chain(code):
+        kind, i, j = space.move_of(op)
+        # 代表状態の位置kが、いまの具体的な状態のどの容器かを対応付ける
+        perm = list(range(space.n))
+        for start, end in space.groups:
+            perm[start:end] = sorted(range(start, end), key=lambda k: vols[k])
+        i, j = perm[i], perm[j]
+
+        if kind == FILL:
+            amount = space.caps[i] - vols[i]
+            vols[i] = space.caps[i]
+        elif kind == EMPTY:
+            amount = vols[i]
+            vols[i] = 0
+        else:
+            amount = min(vols[i], space.caps[j] - vols[j])
+            vols[i] -= amount
+            vols[j] += amount
+
+        # 元の容器の並びに戻して記録
+        original = [0] * space.n
+        for k, v in enumerate(vols):
+            original[space.order[k]] = v
+        path.append(Move(kind, space.order[i], space.order[j], amount, tuple(original)))
+    return path
+
+
+def solve_n_jugs(capacities, goal):
+    """N容器の水差しパズルをBFSで解く（いずれかの容器がgoalになれば終了）"""
+    capacities = list(capacities)
+    if len(capacities) > MAX_JUGS:
+        raise ValueError(f"容器は{MAX_JUGS}個まで対応しています")
+    if not is_solvable_n(capacities, goal):
+        return None
+
+    space = _JugSpace(capacities)
+    table = StateTable.for_size(space.size)
+    table.visit(0)
+    queue = deque([0])
+
+    while queue:
+        code = queue.popleft()
+        vols = space.decode(code)
+        if goal in vols:
+            return _rebuild_n_path(space, table, code)
+
+        for nxt, op in space.successors(vols):
+            next_code = space.encode(space.canonical(nxt))
+            if table.visit(next_code, code, op):
+                queue.append(next_code)
+
+    return None
@@ -0,0 +1,79 @@
+# 水差しパズル - リクエストごとの計測
+"""
+1回の再実行（リクエスト）の中で、探索・状態抽出・グラフ作成・画像書き出しにかかった時間と、
+探索した状態数などの数値を集める。
+
+    profile = start_profile(enabled)      # main() の最初で呼ぶ
+    with current_profile().timer("solve"):
+        ...
+    current_profile().record("states_expanded", n)
+    profile.as_dict()
+
+計測していないときは何もしない NullProfile が返るので、計測箇所のコストはほぼゼロ。
+現在の計測はスレッドごと（ContextVar）に持つので、同時に動く他のセッションとは混ざらない。
+"""
+import time
+from contextlib import contextmanager, nullcontext
+from contextvars import ContextVar
+
+
+class RequestProfile:
+    """1回のリクエストで測った時間（ミリ秒）と数値"""
+
+    enabled = True
+
+    def __init__(self):
+        self.timings = {}
+        self.values = {}
+
+    @contextmanager
+    def timer(self, name):
+        """with ブロックの経過時間を name に加算する"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = (time.perf_counter() - start) * 1000
+            self.timings[name] = self.timings.get(name, 0.0) + elapsed
+
+    def record(self, name, value):
+        self.values[name] = value
+
+    def as_dict(self):
+        """計測結果を {"timings_ms": {...}, 名前: 値, ...} の辞書で返す"""
+        result = {"timings_ms": {name: round(ms, 3) for name, ms in self.timings.items()}}
+        result.update(self.values)
+        return result
+
+
+class NullProfile:
+    """計測しないときの代わり（何も記録しない）"""
+
+    enabled = False
+    _context = nullcontext()
+
+    def timer(self, name):
+        return self._context
+
+    def record(self, name, value):
+        pass
+
+    def as_dict(self):
+        return {}
+
+
+NULL_PROFILE = NullProfile()
+
+_current = ContextVar("water_jug_profile", default=NULL_PROFILE)
+
+
+def start_profile(enabled):
+    """このスレッドのリクエストの計測を始めて、計測オブジェクトを返す"""
+    profile = RequestProfile() if enabled else NULL_PROFILE
+    _current.set(profile)
+    return profile
+
+
+def current_profile():
+    """実行中のリクエストの計測オブジェクト（計測していなければ NULL_PROFILE）"""
+    return _current.get()
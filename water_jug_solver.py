@@ -0,0 +1,534 @@
+# 水差しパズル - ソルバー
+"""
+2容器の水差しパズルのソルバー群（標準ライブラリのみに依存）。
+
+Streamlitやmatplotlibを読み込まないので、CLIやバッチ処理からも
+起動コストなしに使える。画面側（streamlit_app.py）はここから読み込む。
+"""
+import heapq
+from array import array
+from collections import deque
+from math import gcd
+from typing import NamedTuple
+
+from water_jug_moves import EMPTY, FILL, POUR, Move, path_states
+from water_jug_state import ROOT_OP, StateTable
+
+# ====== 基本アルゴリズム関数 ======
+
+def is_solvable(a, b, goal):
+    """数学的に解が存在するかチェック"""
+    if goal > max(a, b):
+        return False
+    return goal % gcd(a, b) == 0
+
+def _next_moves(state_a, state_b, a, b):
+    """現在の状態から遷移可能な (次の状態, 操作番号, 移した量) を列挙"""
+    # 操作1: Aを満たす
+    if state_a < a:
+        yield (a, state_b), 0, 0
+    # 操作2: Bを満たす
+    if state_b < b:
+        yield (state_a, b), 1, 0
+    # 操作3: Aを空にする
+    if state_a > 0:
+        yield (0, state_b), 2, 0
+    # 操作4: Bを空にする
+    if state_b > 0:
+        yield (state_a, 0), 3, 0
+    # 操作5: AからBに移す
+    if state_a > 0 and state_b < b:
+        pour = min(state_a, b - state_b)
+        yield (state_a - pour, state_b + pour), 4, pour
+    # 操作6: BからAに移す
+    if state_b > 0 and state_a < a:
+        pour = min(state_b, a - state_a)
+        yield (state_a + pour, state_b - pour), 5, pour
+
+# 操作番号 → (操作の種類, 操作した容器, 移し先の容器)
+_OPERATIONS = (
+    (FILL, 0, 0), (FILL, 1, 1),
+    (EMPTY, 0, 0), (EMPTY, 1, 1),
+    (POUR, 0, 1), (POUR, 1, 0),
+)
+
+def _make_move(op, prev_state, state):
+    """操作番号と前後の状態からMoveレコードを作成"""
+    kind, source, target = _OPERATIONS[op]
+    return Move(kind, source, target, abs(state[source] - prev_state[source]), state)
+
+def _link_operation(table, prev_code, code, op):
+    """状態表のリンク1本分をMoveレコードに変換"""
+    return _make_move(op, table.decode(prev_code), table.decode(code))
+
+def _rebuild_path(table, code):
+    """親リンクを辿ってゴールまでの手順（Moveのリスト）を復元"""
+    return [_link_operation(table, prev_code, step_code, op)
+            for prev_code, step_code, op in table.chain(code)]
+
+def solve_water_jug_problem(a, b, goal):
+    """BFSで水差しパズルを解く
+
+    各状態には直前の状態と操作だけを記録し（親ポインタ）、
+    手順の文字列はゴール到達時に一度だけ復元する。
+    状態は x*(b+1)+y の整数で表し、StateTableに記録する。
+    """
+    if not is_solvable(a, b, goal):
+        return None
+    
+    # BFSの初期設定
+    table = StateTable(a, b)
+    width = table.width
+    table.visit(0)
+    queue = deque([0])
+    
+    while queue:
+        code = queue.popleft()
+        state_a, state_b = divmod(code, width)
+        
+        # ゴール状態のチェック
+        if state_a == goal or state_b == goal:
+            return _rebuild_path(table, code)
+        
+        # 未訪問の次状態をキューに追加
+        for (next_a, next_b), op, _ in _next_moves(state_a, state_b, a, b):
+            next_code = next_a * width + next_b
+            if table.visit(next_code, code, op):
+                queue.append(next_code)
+    
+    return None
+
+# ====== 問題の正規化（gcdで割る・A/Bをそろえる） ======
+
+def canonical_problem(a, b, goal):
+    """gcdで割り、a <= b にそろえた代表の問題を返す
+
+    到達できる状態は全て g = gcd(a, b, goal) の倍数なので、(6, 9, 3) と (2, 3, 1)、
+    (5, 3, 4) と (3, 5, 4) はそれぞれ同じ問題として解ける。
+    戻り値は ((a', b', goal'), g, A/Bを入れ替えたか)。
+    """
+    g = gcd(gcd(a, b), goal) or 1
+    a, b, goal = a // g, b // g, goal // g
+    if a > b:
+        return (b, a, goal), g, True
+    return (a, b, goal), g, False
+
+def restore_moves(moves, g, swapped):
+    """代表の問題の手順を元の容量の手順に戻す（水量をg倍し、入れ替えを戻す）"""
+    if moves is None or (g == 1 and not swapped):
+        return moves
+    if swapped:
+        return [Move(m.op, 1 - m.source, 1 - m.target, m.amount * g, (m.state[1] * g, m.state[0] * g))
+                for m in moves]
+    return [Move(m.op, m.source, m.target, m.amount * g, (m.state[0] * g, m.state[1] * g))
+            for m in moves]
+
+def solve_canonical(a, b, goal, solve=solve_water_jug_problem):
+    """代表の問題を solve(a', b', goal') で解き、元の容量の手順にして返す
+
+    solve にキャッシュを挟めば、正規化で同じになる問い合わせはキャッシュも共有する。
+    """
+    key, g, swapped = canonical_problem(a, b, goal)
+    return restore_moves(solve(*key), g, swapped)
+
+# ====== 中断・再開できるBFS ======
+
+class ResumableSearch:
+    """容量の組 (a, b) ごとに、目標量が見つかった時点で止めて後から再開できるBFS
+
+    訪問表・親リンクと、展開中の段・次の段のフロンティアを保持する。目標量が変わったら
+    まず発見済みの状態を調べ、まだ現れていなければ前回止めたところから探索を続ける。
+    (a, b) が同じ限り、目標量を何度変えても合計の仕事量はBFS1回分を超えない。
+    """
+
+    def __init__(self, a, b):
+        self.a = a
+        self.b = b
+        self.table = StateTable(a, b)
+        # 水量 → 最初に発見した状態のコード / 手数（-1は未発見、コードは64ビットで持つ）
+        self._goal_code = array('q', [-1]) * (max(a, b) + 1)
+        self._goal_steps = array('i', [-1]) * (max(a, b) + 1)
+        # 展開中の段・その中の位置・次の段
+        self._frontier = [0]
+        self._position = 0
+        self._next = []
+        self._depth = 0
+        # 探索の統計（展開した状態数と、1段のフロンティアの最大長）
+        # last_peak_frontier は直前の探索の呼び出しで展開した段の最大長（展開しなければ0）
+        self.expanded = 0
+        self.peak_frontier = 1
+        self.last_peak_frontier = 0
+        self.table.visit(0)
+        self._record(0, 0)
+
+    def _record(self, code, depth):
+        # BFSでは発見順に手数が増えるので、最初に発見した状態がその水量の最短
+        for volume in divmod(code, self.table.width):
+            if self._goal_code[volume] < 0:
+                self._goal_code[volume] = code
+                self._goal_steps[volume] = depth
+
+    def _search_until(self, goal):
+        """goal を含む状態が見つかるか、全状態を調べ終わるまで探索を進める（goal=Noneなら最後まで）"""
+        table = self.table
+        width = table.width
+        goal_code = self._goal_code
+        peak = 0
+        if (goal is None or goal_code[goal] < 0) and self._position < len(self._frontier):
+            peak = len(self._frontier)
+        while goal is None or goal_code[goal] < 0:
+            if self._position >= len(self._frontier):
+                if not self._next:
+                    self.last_peak_frontier = peak
+                    return False
+                self._frontier, self._next = self._next, []
+                self._position = 0
+                self._depth += 1
+                peak = max(peak, len(self._frontier))
+                self.peak_frontier = max(self.peak_frontier, peak)
+                continue
+            code = self._frontier[self._position]
+            self._position += 1
+            self.expanded += 1
+            state_a, state_b = divmod(code, width)
+            for (next_a, next_b), op, _ in _next_moves(state_a, state_b, self.a, self.b):
+                next_code = next_a * width + next_b
+                if table.visit(next_code, code, op):
+                    self._next.append(next_code)
+                    self._record(next_code, self._depth + 1)
+        self.last_peak_frontier = peak
+        return True
+
+    def step_count(self, goal):
+        """目標量までの最短手数（到達不能ならNone、必要なら探索を進める）"""
+        if not 0 <= goal < len(self._goal_code) or not self._search_until(goal):
+            return None
+        return self._goal_steps[goal]
+
+    def solve(self, goal):
+        """solve_water_jug_problem と同じ形式で最短手順を返す"""
+        if self.step_count(goal) is None:
+            return None
+        return _rebuild_path(self.table, self._goal_code[goal])
+
+# ====== 全目標量の距離索引 ======
+
+class GoalIndex(ResumableSearch):
+    """容量の組 (a, b) ごとに最初に全状態をBFSし、どの目標量にも即答する索引
+
+    ResumableSearch を最後まで進めたもの。目標量を変えても手数はO(1)、手順はO(手数)で得られる。
+    """
+
+    def __init__(self, a, b):
+        super().__init__(a, b)
+        self._search_until(None)
+
+# ====== 双方向BFS（最終状態を指定する場合） ======
+
+def _prev_moves(state_a, state_b, a, b):
+    """(次の状態, 操作番号, 移した量) の逆操作: 1手でこの状態に至る直前の状態を列挙
+
+    1手以上動いた状態は必ずどちらかの容器が空か満杯なので、
+    直前の状態もその「境界上の状態」に限定して候補を絞る。
+    """
+    edge_b = state_b == 0 or state_b == b
+    edge_a = state_a == 0 or state_a == a
+    # 操作1の逆: Aを満たす前
+    if state_a == a:
+        for prev_a in (range(a) if edge_b else (0,)):
+            yield (prev_a, state_b), 0, 0
+    # 操作2の逆: Bを満たす前
+    if state_b == b:
+        for prev_b in (range(b) if edge_a else (0,)):
+            yield (state_a, prev_b), 1, 0
+    # 操作3の逆: Aを空にする前
+    if state_a == 0:
+        for prev_a in (range(1, a + 1) if edge_b else (a,)):
+            yield (prev_a, state_b), 2, 0
+    # 操作4の逆: Bを空にする前
+    if state_b == 0:
+        for prev_b in (range(1, b + 1) if edge_a else (b,)):
+            yield (state_a, prev_b), 3, 0
+    # 操作5の逆: AからBに移す前（Aが空になった or Bが満杯になった）
+    if state_a == 0 or state_b == b:
+        limit = min(state_b, a - state_a) if state_a == 0 else min(b, a - state_a)
+        for pour in {a - state_a, state_b}:
+            if 0 < pour <= limit:
+                yield (state_a + pour, state_b - pour), 4, pour
+    # 操作6の逆: BからAに移す前（Bが空になった or Aが満杯になった）
+    if state_b == 0 or state_a == a:
+        limit = min(state_a, b - state_b) if state_b == 0 else min(a, b - state_b)
+        for pour in {b - state_b, state_a}:
+            if 0 < pour <= limit:
+                yield (state_a - pour, state_b + pour), 5, pour
+
+def solve_water_jug_exact(a, b, targets):
+    """双方向BFSで (0, 0) から指定した最終状態のいずれかへの最短手順を求める
+
+    targetsは (Aの水量, Bの水量) のタプルの集まり。
+    前向きは (0, 0) から、後ろ向きは目標状態から逆操作で探索し、
+    小さい方のフロンティアを1段ずつ広げて両者が出会った時点で終了する。
+    """
+    targets = {(x, y) for x, y in targets if 0 <= x <= a and 0 <= y <= b}
+    if not targets:
+        return None
+    
+    if (0, 0) in targets:
+        return []
+    
+    # 前向きの表は直前の状態、後ろ向きの表は直後の状態をリンクに持つ
+    parent = StateTable(a, b)
+    child = StateTable(a, b)
+    width = parent.width
+    parent.visit(0)
+    back = [x * width + y for x, y in targets]
+    for code in back:
+        child.visit(code)
+    front = [0]
+    
+    while front and back:
+        next_frontier = []
+        if len(front) <= len(back):
+            for code in front:
+                for (next_a, next_b), op, _ in _next_moves(*divmod(code, width), a, b):
+                    next_code = next_a * width + next_b
+                    if not parent.visit(next_code, code, op):
+                        continue
+                    if next_code in child:
+                        return _rebuild_path(parent, next_code) + _rebuild_tail(child, next_code)
+                    next_frontier.append(next_code)
+            front = next_frontier
+        else:
+            for code in back:
+                for (prev_a, prev_b), op, _ in _prev_moves(*divmod(code, width), a, b):
+                    prev_code = prev_a * width + prev_b
+                    if not child.visit(prev_code, code, op):
+                        continue
+                    if prev_code in parent:
+                        return _rebuild_path(parent, prev_code) + _rebuild_tail(child, prev_code)
+                    next_frontier.append(prev_code)
+            back = next_frontier
+    
+    return None
+
+def _rebuild_tail(child, code):
+    """子リンクを辿って出会った状態から目標状態までの手順を復元"""
+    path = []
+    next_code, op = child.link(code)
+    while op != ROOT_OP:
+        path.append(_link_operation(child, code, next_code, op))
+        code = next_code
+        next_code, op = child.link(code)
+    return path
+
+# ====== 重み付きコストの最適解法 ======
+
+# Dialのバケットキューを使う1手のコストの上限（これを超えるとヒープを使う）
+# バケットはコストの値を1ずつ進むので、小さな整数コストのときだけ有利になる
+DIAL_MAX_EDGE_COST = 256
+
+class CostModel(NamedTuple):
+    """操作ごとのコスト（solve_weighted 用、どれも0以上）
+
+    fill_per_liter:  蛇口から汲んだ水1Lあたり
+    empty_per_liter: 捨てた水1Lあたり
+    per_pour:        移し替え1回あたり
+    per_step:        どの操作にも1回ごとにかかる固定コスト
+    """
+
+    fill_per_liter: float = 1
+    empty_per_liter: float = 1
+    per_pour: float = 1
+    per_step: float = 0
+
+    def cost(self, kind, amount):
+        """操作の種類と動いた水量から1手のコストを求める"""
+        if kind == FILL:
+            return self.fill_per_liter * amount + self.per_step
+        if kind == EMPTY:
+            return self.empty_per_liter * amount + self.per_step
+        return self.per_pour + self.per_step
+
+    def scaled(self, g):
+        """水量をg倍した問題で同じ手順が最適になるモデル（canonical_problem と組み合わせる）"""
+        return self._replace(fill_per_liter=self.fill_per_liter * g,
+                             empty_per_liter=self.empty_per_liter * g)
+
+    def is_integral(self):
+        return all(float(c).is_integer() for c in self)
+
+def plan_cost(moves, costs):
+    """手順（Moveのリスト）の合計コスト"""
+    return sum(costs.cost(m.op, m.amount) for m in moves)
+
+def _weighted_edges(code, width, a, b, costs):
+    """状態codeから (次の状態のコード, 操作番号, コスト) を列挙"""
+    state_a, state_b = divmod(code, width)
+    for (next_a, next_b), op, _ in _next_moves(state_a, state_b, a, b):
+        kind, source, _ = _OPERATIONS[op]
+        prev_volume = state_a if source == 0 else state_b
+        next_volume = next_a if source == 0 else next_b
+        yield next_a * width + next_b, op, costs.cost(kind, abs(next_volume - prev_volume))
+
+def _dial_search(a, b, goal, costs, max_edge, table):
+    """整数コスト用: コストごとのバケット（循環配列）から順に取り出すDijkstra法"""
+    width = table.width
+    size = max_edge + 1
+    buckets = [[] for _ in range(size)]
+    best = {0: 0}
+    buckets[0].append(0)
+    pending = 1
+    current = 0
+    while pending:
+        bucket = buckets[current % size]
+        # コスト0の操作は同じバケットに追加されるので、追加分も続けて処理する
+        for code in bucket:
+            pending -= 1
+            if best[code] != current:
+                continue  # より安く到達済みの古い登録
+            if code // width == goal or code % width == goal:
+                return code, current
+            for next_code, op, cost in _weighted_edges(code, width, a, b, costs):
+                cost = current + int(cost)
+                known = best.get(next_code)
+                if known is None or cost < known:
+                    best[next_code] = cost
+                    if known is None:
+                        table.visit(next_code, code, op)
+                    else:
+                        table.relink(next_code, code, op)
+                    buckets[cost % size].append(next_code)
+                    pending += 1
+        bucket.clear()
+        current += 1
+    return None, None
+
+def _heap_search(a, b, goal, costs, table):
+    """任意のコスト用: 二分ヒープのDijkstra法（同じコストなら手数の少ない方を先に取り出す）"""
+    width = table.width
+    best = {0: 0}
+    heap = [(0, 0, 0)]
+    while heap:
+        current, steps, code = heapq.heappop(heap)
+        if best[code] < current:
+            continue
+        if code // width == goal or code % width == goal:
+            return code, current
+        for next_code, op, cost in _weighted_edges(code, width, a, b, costs):
+            cost += current
+            known = best.get(next_code)
+            if known is None or cost < known:
+                best[next_code] = cost
+                if known is None:
+                    table.visit(next_code, code, op)
+                else:
+                    table.relink(next_code, code, op)
+                heapq.heappush(heap, (cost, steps + 1, next_code))
+    return None, None
+
+def solve_weighted(a, b, goal, costs=CostModel(), method=None):
+    """操作ごとのコストの合計が最小になる手順（Moveのリスト）を返す
+
+    操作は solve_water_jug_problem と同じ6種類。コストが全て整数で1手のコストが
+    DIAL_MAX_EDGE_COST 以下ならDialのバケットキュー、それ以外は二分ヒープを使う
+    （method="dial" / "heap" で指定も可）。
+    """
+    if any(c < 0 for c in costs):
+        raise ValueError(f"costs must be non-negative: {costs}")
+    if not is_solvable(a, b, goal):
+        return None
+    
+    max_edge = max(costs.cost(FILL, max(a, b)), costs.cost(EMPTY, max(a, b)), costs.cost(POUR, 0))
+    if method is None:
+        method = "dial" if costs.is_integral() and max_edge <= DIAL_MAX_EDGE_COST else "heap"
+    table = StateTable(a, b)
+    table.visit(0)
+    if method == "dial":
+        if not costs.is_integral():
+            raise ValueError("the bucket queue needs integer costs")
+        code, _ = _dial_search(a, b, goal, costs, int(max_edge), table)
+    elif method == "heap":
+        code, _ = _heap_search(a, b, goal, costs, table)
+    else:
+        raise ValueError(f"unknown method: {method!r}")
+    return None if code is None else _rebuild_path(table, code)
+
+# ====== 2容器専用の定数メモリ解法 ======
+
+def _cycle_step_count(fill_cap, other_cap, goal):
+    """「fill_capを満たしてother_capに移す」サイクルでgoalに届く手数を計算
+
+    x回目の給水中に目標量が現れるのは x*fill_cap ≡ goal (mod other_cap) のときだけなので、
+    xはモジュラ逆元から直接求まる（シミュレーション不要）。
+    """
+    g = gcd(fill_cap, other_cap)
+    period = other_cap // g
+    x = (goal // g) * pow(fill_cap // g, -1, period) % period if period > 1 else 0
+    if x == 0:
+        x = period
+    while True:
+        # x-1回目の給水を終えた時点でのother側の水量
+        remain = (x - 1) * fill_cap % other_cap
+        empties = (x * fill_cap - goal) // other_cap
+        # 注いだ直後に給水側へgoalが残る場合
+        if goal <= fill_cap + remain - other_cap:
+            return 2 * x + 2 * empties - 2
+        # 給水側が空になった時点で受け側がgoalになる場合
+        if goal < other_cap:
+            return 2 * x + 2 * empties
+        x += period
+
+def _iter_cycle_moves(a, b, goal, fill_a):
+    """サイクルを1手ずつシミュレートしてMoveを返す"""
+    state_a, state_b = 0, 0
+    while state_a != goal and state_b != goal:
+        prev_state = (state_a, state_b)
+        if fill_a:
+            if state_a == 0:
+                state_a, op = a, 0
+            elif state_b == b:
+                state_b, op = 0, 3
+            else:
+                pour = min(state_a, b - state_b)
+                state_a, state_b, op = state_a - pour, state_b + pour, 4
+        else:
+            if state_b == 0:
+                state_b, op = b, 1
+            elif state_a == a:
+                state_a, op = 0, 2
+            else:
+                pour = min(state_b, a - state_a)
+                state_a, state_b, op = state_a + pour, state_b - pour, 5
+        yield _make_move(op, prev_state, (state_a, state_b))
+
+def two_jug_step_count(a, b, goal):
+    """2容器の最短手数を定数時間・定数メモリで求める（解なしはNone）"""
+    if not is_solvable(a, b, goal):
+        return None
+    if goal == 0:
+        return 0
+    if goal == a or goal == b:
+        return 1
+    return min(_cycle_step_count(a, b, goal), _cycle_step_count(b, a, goal))
+
+def iter_two_jug_solution(a, b, goal):
+    """2容器の最短手順をジェネレータで1手ずつ返す
+
+    最短解は「Aを満たしてBに移す」か「Bを満たしてAに移す」の
+    どちらかのサイクルなので、短い方だけをシミュレートする。
+    BFSと違い状態表を持たないため、10^9L級の容量でも扱える。
+    """
+    if not is_solvable(a, b, goal) or goal == 0:
+        return
+    if goal == a:
+        yield Move(FILL, 0, 0, a, (a, 0))
+        return
+    if goal == b:
+        yield Move(FILL, 1, 1, b, (0, b))
+        return
+    fill_a = _cycle_step_count(a, b, goal) <= _cycle_step_count(b, a, goal)
+    yield from _iter_cycle_moves(a, b, goal, fill_a)
+
+def extract_path_states(steps, a_cap, b_cap):
+    """ステップ（Moveのリスト）から各状態を抽出"""
+    return path_states(steps)
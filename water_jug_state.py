@@ -0,0 +1,108 @@
+# 水差しパズル - パック済み状態表
+"""
+状態 (x, y) を x*(b+1)+y の整数1つで表し、訪問フラグ（操作番号）を bytearray、
+親リンクを array('i') に持つ状態表。タプル＋setに比べて1状態あたりのメモリが
+1/10以下になり、BFSのホットループからハッシュ計算がなくなる。
+
+状態グリッドが DENSE_STATE_LIMIT を超える場合（大容量の2容器など）は、
+同じインターフェースのまま整数キーの辞書に切り替える。
+"""
+from array import array
+
+# 密な表を確保する最大セル数（bytearray 4MB + array('i') 16MB）
+DENSE_STATE_LIMIT = 1 << 22
+
+# 開始状態など、親を持たない状態に記録する操作番号（操作番号は0〜253）
+ROOT_OP = 0xFE
+
+
+class StateTable:
+    """パック済み状態の訪問フラグ・親リンク表"""
+
+    __slots__ = ("width", "size", "_flags", "_links", "_sparse")
+
+    def __init__(self, a, b, dense_limit=DENSE_STATE_LIMIT):
+        self.width = b + 1
+        self._allocate((a + 1) * (b + 1), dense_limit)
+
+    @classmethod
+    def for_size(cls, size, dense_limit=DENSE_STATE_LIMIT):
+        """任意の大きさの状態グリッド用の表を作る（N容器などコードを自前で計算する場合）"""
+        table = cls.__new__(cls)
+        table.width = 1
+        table._allocate(size, dense_limit)
+        return table
+
+    def _allocate(self, size, dense_limit):
+        self.size = size
+        if size <= dense_limit:
+            # フラグは「操作番号+1」（0は未訪問）
+            self._flags = bytearray(self.size)
+            self._links = array("i", bytes(4 * self.size))
+            self._sparse = None
+        else:
+            # 値は「親のコード << 8 | 操作番号」
+            self._flags = None
+            self._links = None
+            self._sparse = {}
+
+    def encode(self, x, y):
+        """(x, y) をパック済み整数に変換"""
+        return x * self.width + y
+
+    def decode(self, code):
+        """パック済み整数を (x, y) に戻す"""
+        return divmod(code, self.width)
+
+    def visit(self, code, prev=-1, op=ROOT_OP):
+        """未訪問なら親と操作番号を記録してTrueを返す"""
+        if self._sparse is None:
+            if self._flags[code]:
+                return False
+            self._flags[code] = op + 1
+            self._links[code] = prev
+            return True
+        if code in self._sparse:
+            return False
+        self._sparse[code] = (prev << 8) | op
+        return True
+
+    def seen(self, code):
+        """訪問済みかどうか"""
+        if self._sparse is None:
+            return self._flags[code] != 0
+        return code in self._sparse
+
+    __contains__ = seen
+
+    def count(self):
+        """訪問済みの状態数（探索ループには手を入れず、表から数える）"""
+        if self._sparse is None:
+            return self.size - self._flags.count(0)
+        return len(self._sparse)
+
+    def relink(self, code, prev, op):
+        """訪問済みの状態の親と操作番号を書き換える（重み付き探索でより安い経路が見つかった場合）"""
+        if self._sparse is None:
+            self._flags[code] = op + 1
+            self._links[code] = prev
+        else:
+            self._sparse[code] = (prev << 8) | op
+
+    def link(self, code):
+        """(親のコード, 操作番号) を返す（開始状態の親は-1）"""
+        if self._sparse is None:
+            return self._links[code], self._flags[code] - 1
+        packed = self._sparse[code]
+        return packed >> 8, packed & 0xFF
+
+    def chain(self, code):
+        """開始状態からcodeまでの (親のコード, コード, 操作番号) を順に返す"""
+        chain = []
+        prev, op = self.link(code)
+        while op != ROOT_OP:
+            chain.append((prev, code, op))
+            code = prev
+            prev, op = self.link(code)
+        chain.reverse()
+        return chain
@@ -16,6 +16,8 @@ import matplotlib.patches as mpatches
 import japanize_matplotlib
 from math import gcd
 from collections import deque
+from water_jug_moves import FILL, Move, format_move
+from water_jug_state import StateTable
 
 def test_water_jug_functions():
     """水差しパズルの基本機能テスト"""
@@ -83,7 +85,7 @@ def solve_water_jug_problem(a, b, goal):
         return []
     
     queue = deque([(0, 0, [])])
-    visited = set()
+    visited = StateTable(a, b)
     
     while queue:
         state_a, state_b, path = queue.popleft()
@@ -91,9 +93,8 @@ def solve_water_jug_problem(a, b, goal):
         if state_a == goal or state_b == goal:
             return path
         
-        if (state_a, state_b) in visited:
+        if not visited.visit(visited.encode(state_a, state_b)):
             continue
-        visited.add((state_a, state_b))
         
         # 可能な操作
         operations = [
@@ -116,6 +117,490 @@ def solve_water_jug_problem(a, b, goal):
     
     return []
 
+def test_parent_pointer_bfs_large_capacity():
+    """大容量でも親ポインタBFSで最短手順を復元できること"""
+    import water_jug_solver
+
+    steps = water_jug_solver.solve_water_jug_problem(100003, 99991, 1)
+    states = water_jug_solver.extract_path_states(steps, 100003, 99991)
+    assert len(states) == len(steps) + 1
+    assert 1 in states[-1]
+    # 手順はMoveレコードで返り、文字列は表示時に作る
+    first = water_jug_solver.solve_water_jug_problem(3, 5, 4)[0]
+    assert first == Move(FILL, 1, 1, 5, (0, 5))
+    assert format_move(first) == "B容器を満たす → (0L, 5L)"
+
+def test_two_jug_cycle_solver_matches_bfs():
+    """サイクル解法の手数がBFSの最短手数と一致すること"""
+    import water_jug_solver
+
+    for a in range(1, 13):
+        for b in range(1, 13):
+            for goal in range(1, max(a, b) + 1):
+                steps = water_jug_solver.solve_water_jug_problem(a, b, goal)
+                moves = list(water_jug_solver.iter_two_jug_solution(a, b, goal))
+                expected = len(steps) if steps is not None else None
+                assert water_jug_solver.two_jug_step_count(a, b, goal) == expected
+                assert len(moves) == (expected or 0)
+
+    # 10^9L級でも手数は即座に求まり、手順は遅延生成される
+    assert water_jug_solver.two_jug_step_count(10**9 + 7, 10**9 + 9, 12345) > 10**9
+    moves = water_jug_solver.iter_two_jug_solution(10**9 + 7, 10**9 + 9, 12345)
+    assert next(moves) == Move(FILL, 0, 0, 10**9 + 7, (10**9 + 7, 0))
+
+def test_bidirectional_exact_target():
+    """双方向BFSが指定した最終状態への最短手順を返すこと"""
+    import water_jug_solver
+
+    steps = water_jug_solver.solve_water_jug_exact(3, 5, [(0, 4)])
+    states = water_jug_solver.extract_path_states(steps, 3, 5)
+    assert states[-1] == (0, 4)
+    assert len(steps) == 7  # (3, 4) までの6手 + Aを空にする
+    assert water_jug_solver.solve_water_jug_exact(2, 4, [(0, 3)]) is None
+    assert water_jug_solver.solve_water_jug_exact(3, 5, [(0, 0)]) == []
+
+def test_n_jug_solver():
+    """N容器ソルバーが2容器の結果と一致し、同容量の容器をまとめても解けること"""
+    import water_jug_solver
+    from water_jug_multi import is_solvable_n, solve_n_jugs
+
+    for a in range(1, 9):
+        for b in range(1, 9):
+            for goal in range(1, max(a, b) + 1):
+                expected = water_jug_solver.solve_water_jug_problem(a, b, goal)
+                steps = solve_n_jugs([a, b], goal)
+                assert (steps is None) == (expected is None)
+                if steps is not None:
+                    assert len(steps) == len(expected)
+
+    assert is_solvable_n([6, 10, 15], 1)
+    assert not is_solvable_n([4, 6, 8], 3)
+    steps = solve_n_jugs([8, 5, 5, 3], 4)
+    assert steps and 4 in steps[-1].state and len(steps[-1].state) == 4
+    assert solve_n_jugs([4, 6, 8], 3) is None
+
+def test_goal_index_matches_bfs():
+    """全目標量の索引が目標量ごとのBFSと同じ手順を返すこと"""
+    import water_jug_solver
+
+    index = water_jug_solver.GoalIndex(7, 11)
+    for goal in range(1, 12):
+        assert index.solve(goal) == water_jug_solver.solve_water_jug_problem(7, 11, goal)
+        assert index.step_count(goal) == len(index.solve(goal))
+    assert water_jug_solver.GoalIndex(2, 4).solve(3) is None
+
+    # 状態コードが32ビットを超える大容量でも索引を作れる
+    large = water_jug_solver.GoalIndex(50021, 50023)
+    assert large.step_count(1) == len(water_jug_solver.solve_water_jug_problem(50021, 50023, 1))
+    assert 1 in large.solve(1)[-1].state
+
+def test_solve_cache_lru_and_ttl():
+    """解キャッシュが件数上限とTTLで古いエントリを捨て、ヒット/ミスを数えること"""
+    from water_jug_cache import SolveCache
+
+    now = [0.0]
+    cache = SolveCache(max_entries=2, ttl=10, clock=lambda: now[0])
+    calls = []
+    solve = lambda key: cache.get_or_compute(key, lambda: calls.append(key) or key)
+
+    solve((3, 5, 4))
+    solve((3, 5, 4))
+    solve((2, 6, 4))
+    solve((7, 11, 6))  # 上限2件なので (3, 5, 4) が捨てられる
+    solve((3, 5, 4))
+    assert calls == [(3, 5, 4), (2, 6, 4), (7, 11, 6), (3, 5, 4)]
+
+    now[0] = 11.0  # TTL切れ
+    solve((3, 5, 4))
+    assert calls[-1] == (3, 5, 4) and len(calls) == 5
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["evictions"]) == (1, 5, 2)
+
+def test_render_cache_byte_limit():
+    """描画キャッシュが合計バイト数の上限を超えた分を古い順に捨てること"""
+    from water_jug_cache import RenderCache
+
+    cache = RenderCache(max_bytes=10)
+    cache.put("a", b"1234")
+    cache.put("b", b"1234")
+    assert cache.get("a") == b"1234"  # "a" を最近使った扱いにする
+    cache.put("c", b"1234")           # 12バイトになるので "b" が捨てられる
+    cache.put("huge", b"x" * 11)      # 上限を超える画像は保存しない
+    assert cache.get("b") is None and cache.get("huge") is None
+    assert cache.stats()["bytes"] == 8
+
+def test_simple_visualization_long_solution():
+    """長い手順でも棒はA・Bの2つのコレクションだけで描かれ、ラベルは間引かれること"""
+    import streamlit_app
+
+    steps = streamlit_app.solve_water_jug_problem(997, 1009, 500)
+    states = streamlit_app.extract_path_states(steps, 997, 1009)
+    fig = streamlit_app.create_simple_visualization(states, steps, 997, 1009, 500)
+    ax = fig.axes[0]
+    assert len(ax.collections) == 2 and not ax.patches
+    assert len(ax.get_yticklabels()) <= streamlit_app.LABEL_STEP_LIMIT
+    plt.close(fig)
+
+def test_solver_import_budget():
+    """ソルバーだけを使う経路は標準ライブラリしか読み込まないこと"""
+    import json
+    import subprocess
+
+    code = (
+        "import json, sys\n"
+        "import water_jug_solver, water_jug_multi\n"
+        "import streamlit_app\n"
+        "heavy = [m for m in ('numpy', 'matplotlib', 'networkx') if m in sys.modules]\n"
+        "print(json.dumps({'heavy': heavy}))\n"
+    )
+    result = subprocess.run(
+        [sys.executable, "-c", code],
+        cwd=os.path.dirname(os.path.abspath(__file__)),
+        capture_output=True, text=True, check=True,
+    )
+    report = json.loads(result.stdout.strip().splitlines()[-1])
+    assert report["heavy"] == []
+
+def test_font_manifest_reused_until_fonts_change(tmp_path):
+    """フォントの指紋が同じ間はマニフェストを読むだけで、変われば検出し直すこと"""
+    import json
+    import water_jug_fonts
+
+    path = str(tmp_path / "font_manifest.json")
+    manifest = water_jug_fonts.build_manifest(path)
+    assert manifest["fingerprint"] == water_jug_fonts.font_fingerprint()
+
+    # 検出し直さずにマニフェストの内容がそのまま使われる
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(dict(manifest, source="marker"), f)
+    assert water_jug_fonts.load_font_settings.__wrapped__(path)["source"] == "marker"
+
+    # 指紋が合わなければ検出し直して書き換える
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(dict(manifest, source="marker", fingerprint="stale"), f)
+    assert water_jug_fonts.load_font_settings.__wrapped__(path)["source"] != "marker"
+
+def test_solve_batch_order_and_mirror():
+    """一括ソルバーが入力順に結果を返し、A・Bの入れ替えをまとめても正しい手順を返すこと"""
+    from water_jug_batch import solve_batch
+    from water_jug_moves import path_states
+    from water_jug_solver import solve_water_jug_problem
+
+    queries = [(a, b, goal) for a in range(1, 9) for b in range(1, 9) for goal in (1, 4, 9)]
+    results = solve_batch(queries, workers=2, chunksize=8)
+    assert len(results) == len(queries)
+    for (a, b, goal), steps in zip(queries, results):
+        expected = solve_water_jug_problem(a, b, goal)
+        assert (steps is None) == (expected is None)
+        if steps is not None:
+            states = path_states(steps)
+            assert len(steps) == len(expected)
+            assert goal in states[-1]
+            assert all(x <= a and y <= b for x, y in states)
+    assert solve_batch([(0, 0, 0), (2, 4, 3)]) == [None, None]
+
+def test_benchmark_reports_states_and_memory(tmp_path, monkeypatch):
+    """ベンチマークが訪問状態数とピークメモリを報告すること"""
+    from water_jug_bench import run
+
+    # 読み込むアプリがフォントのマニフェストを書くので、ユーザーのキャッシュに書かせない
+    monkeypatch.setenv("WATER_JUG_FONT_MANIFEST", str(tmp_path / "font_manifest.json"))
+
+    rows = list(run(max_capacity=10, only="solve"))
+    assert {row["name"] for row in rows} == {"solve: streamlit_app", "solve: cloud", "solve: water_jug_test"}
+    for row in rows:
+        assert (row["a"], row["b"], row["goal"]) == (10, 11, 5)
+        assert row["states"] > 0 and row["peak_kib"] > 0
+        assert row["steps"] == 18
+
+def test_cli_streams_results_in_order():
+    """CLIが入力順に1件ずつ結果を返し、不正な行はエラーとして報告すること"""
+    from water_jug_cli import iter_results
+
+    lines = ["5 3 4", "# comment", "", "[2, 4, 3]", '{"a": 6, "b": 9, "goal": 3}', "1 2",
+             '{"a": 5, "b": 3}', "[5, null, 4]", "[1.7, 3, 1]", "[true, 3, 1]", "1.7 3 1", "2 3 1"]
+    results = list(iter_results(lines))
+    assert [r.get("solvable") for r in results] == [True, False, True] + [None] * 6 + [True]
+    assert results[0]["step_count"] == len(results[0]["moves"]) == 6
+    assert 4 in results[0]["moves"][-1]["state"]
+    assert [r.get("line") for r in results[3:9]] == [6, 7, 8, 9, 10, 11]
+    assert all("error" in r for r in results[3:9])
+
+    lines = [f"{a} 7 5" for a in range(1, 80)]
+    assert list(iter_results(lines, workers=2)) == list(iter_results(lines))
+
+def test_disk_cache_shared_and_bounded(tmp_path):
+    """ディスクキャッシュが別インスタンス（別プロセス相当）と共有され、サイズ上限を守ること"""
+    import sqlite3
+    import time
+
+    from water_jug_disk_cache import ROW_OVERHEAD, DiskSolveCache
+    from water_jug_disk_cache import main as disk_cache_main
+    from water_jug_solver import solve_water_jug_problem
+
+    path = str(tmp_path / "solutions.sqlite3")
+    writer = DiskSolveCache(path)
+    steps = solve_water_jug_problem(3, 5, 4)
+    writer.put((3, 5, 4), steps)
+    writer.put((2, 4, 3), None)
+
+    reader = DiskSolveCache(path)
+    assert reader.get((3, 5, 4)) == steps
+    assert reader.get((2, 4, 3), "missing") is None
+    assert reader.get((1, 2, 1), "missing") == "missing"
+    # A・Bを入れ替えた問い合わせは同じ行から手順を入れ替えて返す
+    mirrored = reader.get((5, 3, 4))
+    assert [m.state for m in mirrored] == [m.state[::-1] for m in steps]
+    assert [(m.source, m.target) for m in mirrored] == [(1 - m.source, 1 - m.target) for m in steps]
+    assert reader.stats()["entries"] == 2
+
+    # 他の接続が書き込み中でも、読み出しは待たされずにヒットする（時刻の更新だけを諦める）
+    later = DiskSolveCache(path, clock=lambda: time.time() + 3600)
+    lock = sqlite3.connect(path, isolation_level=None)
+    lock.execute("BEGIN IMMEDIATE")
+    start = time.perf_counter()
+    assert later.get((3, 5, 4)) == steps
+    assert time.perf_counter() - start < 5
+    lock.execute("ROLLBACK")
+    lock.close()
+    assert later.stats()["errors"] == 0 and later.stats()["hits"] == 1
+
+    small = DiskSolveCache(str(tmp_path / "small.sqlite3"), max_bytes=10 * (ROW_OVERHEAD + 40))
+    for goal in range(1, 40):
+        small.put((39, 40, goal), solve_water_jug_problem(39, 40, goal))
+    stats = small.stats()
+    assert stats["bytes"] <= stats["max_bytes"] and stats["evictions"] > 0
+    # 件数と合計サイズは書き込みのたびに足し引きした値で、表を数え直した値と一致する
+    small.put((39, 40, 39), None)
+    small.put((39, 40, 39), solve_water_jug_problem(39, 40, 39))
+    conn = sqlite3.connect(small.path)
+    assert tuple(conn.execute("SELECT COUNT(*), SUM(size) FROM solutions").fetchone()) == (
+        small.stats()["entries"], small.stats()["bytes"])
+    # 合計を持たない以前の形式のファイルは開いたときに数え直す
+    conn.execute("DROP TABLE totals")
+    conn.close()
+    assert DiskSolveCache(small.path).stats()["bytes"] == small.stats()["bytes"]
+
+    # ウォームアップは不正な行を報告して読み飛ばし、残りの行は保存する
+    queries = tmp_path / "queries.txt"
+    queries.write_text('5 3 4\n{"a": 5, "b": 3}\nfoo\n7 11 2\n', encoding="utf-8")
+    warm_path = str(tmp_path / "warm.sqlite3")
+    assert disk_cache_main(["--path", warm_path, "warm", str(queries)]) == 1
+    assert DiskSolveCache(warm_path).stats()["entries"] == 2
+
+def test_canonical_problem_scales_moves_back():
+    """gcdで割り・A/Bをそろえて解いた手順が、元の容量で正しい最短手順になること"""
+    from water_jug_moves import move_between
+    from water_jug_solver import canonical_problem, solve_canonical, solve_water_jug_problem
+
+    assert canonical_problem(6, 9, 3)[0] == canonical_problem(9, 6, 3)[0] == (2, 3, 1)
+    assert canonical_problem(6, 9, 4) == ((6, 9, 4), 1, False)
+
+    for a in range(1, 16):
+        for b in range(1, 16):
+            for goal in range(max(a, b) + 1):
+                expected = solve_water_jug_problem(a, b, goal)
+                steps = solve_canonical(a, b, goal)
+                assert (steps is None) == (expected is None)
+                if not steps:
+                    continue
+                assert len(steps) == len(expected)
+                assert goal in steps[-1].state
+                prev = (0, 0)
+                for move in steps:
+                    assert move_between(prev, move.state, (a, b)) == move
+                    prev = move.state
+
+def test_single_flight_coalesces_concurrent_calls():
+    """同時に来た同じキーの計算が1回だけ実行され、結果が全員に返ること"""
+    import threading
+    import time
+
+    from water_jug_cache import SingleFlight
+
+    flight = SingleFlight()
+    started = threading.Event()
+    release = threading.Event()
+    calls = []
+
+    def compute():
+        calls.append(1)
+        started.set()
+        release.wait(5)
+        return "steps"
+
+    results = []
+    leader = threading.Thread(target=lambda: results.append(flight.do("k", compute)))
+    leader.start()
+    started.wait(5)
+    waiters = [threading.Thread(target=lambda: results.append(flight.do("k", compute))) for _ in range(4)]
+    for t in waiters:
+        t.start()
+    while flight.stats()["coalesced"] < 4:
+        time.sleep(0.001)
+    release.set()
+    for t in [leader, *waiters]:
+        t.join(5)
+
+    assert results == ["steps"] * 5 and len(calls) == 1
+    assert flight.stats() == {"executions": 1, "coalesced": 4, "in_flight": 0}
+    # 終わった後の呼び出しは新しく実行する
+    assert flight.do("k", lambda: "again") == "again"
+
+def test_step_columns_only_builds_visible_window():
+    """手順表が指定した範囲の行だけを作り、検索が操作名・状態で絞り込めること"""
+    import water_jug_moves
+    from water_jug_moves import search_moves, step_columns
+    from water_jug_solver import solve_water_jug_problem
+
+    steps = solve_water_jug_problem(997, 1009, 500)
+    described = []
+    describe = lambda move: described.append(move) or water_jug_moves.describe_move(move)
+    columns = step_columns(steps, range(100, 125), describe)
+    assert len(described) == 25
+    assert columns["Step"] == list(range(101, 126))
+    assert list(zip(columns["A (L)"], columns["B (L)"])) == [m.state for m in steps[100:125]]
+
+    fills = search_moves(steps, "FILL")
+    assert fills and all(steps[i].op == water_jug_moves.FILL for i in fills)
+    assert search_moves(steps, "500L") == [len(steps) - 1]
+
+def test_distance_grid_matches_scalar_bfs():
+    """配列演算のBFSが、ソルバーと同じ操作による1状態ずつのBFSと同じ手数になること"""
+    import numpy as np
+
+    from water_jug_grid import UNREACHABLE, distance_grid, goal_distances
+    from water_jug_solver import GoalIndex, _next_moves
+
+    for a, b in [(3, 5), (4, 6), (7, 11), (12, 8)]:
+        expected = {(0, 0): 0}
+        queue = deque([(0, 0)])
+        while queue:
+            state = queue.popleft()
+            for next_state, _, _ in _next_moves(*state, a, b):
+                if next_state not in expected:
+                    expected[next_state] = expected[state] + 1
+                    queue.append(next_state)
+
+        grid = distance_grid(a, b)
+        assert grid.shape == (a + 1, b + 1) and grid.dtype == np.int32
+        for x in range(a + 1):
+            for y in range(b + 1):
+                assert grid[x, y] == expected.get((x, y), UNREACHABLE)
+
+        index = GoalIndex(a, b)
+        for goal, steps in enumerate(goal_distances(grid)):
+            expected_steps = index.step_count(goal)
+            assert steps == (UNREACHABLE if expected_steps is None else expected_steps)
+
+def test_solvability_matrix_matches_is_solvable():
+    """容量の範囲全体の判定行列が、1組ずつの is_solvable と一致すること"""
+    from water_jug_batch import solvability_matrix
+
+    a_values, b_values, goals = range(1, 30), range(1, 40), [0, 4, 9, 35]
+    matrix = solvability_matrix(a_values, b_values, 4)
+    cube = solvability_matrix(a_values, b_values, goals)
+    assert matrix.shape == (29, 39) and cube.shape == (29, 39, 4)
+    for i, a in enumerate(a_values):
+        for j, b in enumerate(b_values):
+            assert matrix[i, j] == is_solvable(a, b, 4)
+            assert list(cube[i, j]) == [is_solvable(a, b, goal) for goal in goals]
+
+def test_request_profile_records_only_when_enabled():
+    """計測を有効にしたときだけ時間と数値が記録され、無効時は何も残らないこと"""
+    from water_jug_profile import NULL_PROFILE, current_profile, start_profile
+    from water_jug_solver import GoalIndex
+
+    profile = start_profile(True)
+    assert current_profile() is profile
+    index = GoalIndex(7, 11)
+    with current_profile().timer("solve"):
+        current_profile().record("states_expanded", index.expanded)
+    report = profile.as_dict()
+    assert report["timings_ms"]["solve"] >= 0
+    assert report["states_expanded"] == index.table.count() and index.peak_frontier >= 1
+
+    assert start_profile(False) is NULL_PROFILE
+    with current_profile().timer("solve"):
+        current_profile().record("states_expanded", 1)
+    assert current_profile().as_dict() == {}
+
+def test_weighted_solver_dial_and_heap_agree():
+    """重み付き探索がバケットキューとヒープで同じ最小コストになり、正しい手順を返すこと"""
+    import itertools
+
+    from water_jug_moves import move_between
+    from water_jug_solver import CostModel, plan_cost, solve_water_jug_problem, solve_weighted
+
+    models = [CostModel(), CostModel(1, 0, 0, 0), CostModel(0, 3, 1, 2), CostModel(0, 0, 0, 1)]
+    for costs, a, b in itertools.product(models, range(1, 10), range(1, 10)):
+        for goal in range(max(a, b) + 1):
+            dial = solve_weighted(a, b, goal, costs, method="dial")
+            heap = solve_weighted(a, b, goal, costs, method="heap")
+            assert (dial is None) == (heap is None) == (not is_solvable(a, b, goal))
+            if dial is None:
+                continue
+            assert plan_cost(dial, costs) == plan_cost(heap, costs)
+            prev = (0, 0)
+            for move in dial:
+                assert move_between(prev, move.state, (a, b)) == move
+                prev = move.state
+            if costs == CostModel(0, 0, 0, 1):
+                # 1手ごとのコストだけなら最短手数と一致する
+                assert len(dial) == len(solve_water_jug_problem(a, b, goal))
+
+    # 汲む量が高いときは、手数が多くても汲む量の少ない手順を選ぶ
+    cheap = solve_weighted(3, 5, 4, CostModel(10, 0, 0, 0))
+    assert plan_cost(cheap, CostModel(10, 0, 0, 0)) == 90
+    assert len(cheap) > len(solve_water_jug_problem(3, 5, 4))
+    assert plan_cost(solve_weighted(3, 5, 4, CostModel(1.5, 0.5, 0.25)), CostModel(1.5, 0.5, 0.25)) > 0
+
+def test_resumable_search_continues_across_goals():
+    """目標量を変えても探索を続きから再開し、合計の展開数がBFS1回分を超えないこと"""
+    from water_jug_solver import ResumableSearch, solve_water_jug_problem
+
+    search = ResumableSearch(97, 101)
+    first = search.solve(1)
+    expanded = search.expanded
+    assert len(first) == len(solve_water_jug_problem(97, 101, 1))
+    assert expanded < search.table.count() + 1
+    assert 0 < search.last_peak_frontier <= search.peak_frontier
+    # 発見済みの目標量は展開せず、その呼び出しのフロンティアも0
+    search.solve(1)
+    assert search.expanded == expanded and search.last_peak_frontier == 0
+
+    for goal in range(2, 102):
+        steps = search.solve(goal)
+        assert len(steps) == len(solve_water_jug_problem(97, 101, goal)) == search.step_count(goal)
+        assert goal in steps[-1].state
+    # 全状態を1回ずつしか展開していない
+    assert search.expanded <= search.table.count()
+    assert search.solve(0) == [] and search.solve(102) is None
+
+    # 解けない目標量は探索し尽くしてNoneを返す
+    even = ResumableSearch(4, 6)
+    assert even.solve(3) is None and even.solve(2) is not None
+
+    # 状態コードが32ビットを超える大容量でも探索できる
+    large = ResumableSearch(100003, 99991)
+    assert len(large.solve(1)) == len(solve_water_jug_problem(100003, 99991, 1))
+
+def test_app_shows_weighted_plan_like_shortest_path(tmp_path, monkeypatch):
+    """コスト最小の手順も最短手順と同じく手順表とグラフで表示されること"""
+    from streamlit.testing.v1 import AppTest
+
+    monkeypatch.setenv("WATER_JUG_DISK_CACHE", str(tmp_path / "solutions.sqlite3"))
+    app = AppTest.from_file(os.path.join(os.path.dirname(os.path.abspath(__file__)), "streamlit_app.py"),
+                            default_timeout=60)
+    app.run()
+    next(c for c in app.sidebar.checkbox if c.label == "Minimize Cost").check()
+    next(c for c in app.sidebar.checkbox if c.label == "Show Distance Heatmap").check()
+    app.run()
+    assert not app.exception
+    assert any("Minimum-cost plan" in m.value for m in app.markdown)
+    assert len(app.dataframe) > 0
+    assert [e.type for e in app.main].count("image") == 2
+
 def create_test_graph():
     """テスト用の日本語グラフを作成"""
     # テストデータ